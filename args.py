@@ -1,18 +1,39 @@
-import argparse
+import contextlib
 import sys
 
 class Args:
+  # arguments are only collected until first use, argparse is not needed
+  # before then.
   def __init__(self):
-    self.parser = argparse.ArgumentParser()
+    self.arguments = []
     self.args = None
 
   def add_argument(self, *args, **kwargs):
-    self.parser.add_argument(*args, **kwargs)
+    self.arguments.append((args, kwargs))
 
-  def __getattr__(self, name):
+  def parse(self):
     if not self.args:
-      self.args = self.parser.parse_args()
-    return self.args.__getattribute__(name)
+      import argparse
+      parser = argparse.ArgumentParser()
+      for args, kwargs in self.arguments:
+        parser.add_argument(*args, **kwargs)
+      self.args = parser.parse_args()
+    return self.args
+
+  def __getattr__(self, name):
+    return self.parse().__getattribute__(name)
+
+  @contextlib.contextmanager
+  def override(self, **values):
+    args = self.parse()
+    old = {k: getattr(args, k, None) for k in values}
+    try:
+      for k, v in values.items():
+        setattr(args, k, v)
+      yield
+    finally:
+      for k, v in old.items():
+        setattr(args, k, v)
 
   def get_required(self, name):
     val = self.__getattr__(name)
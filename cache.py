@@ -0,0 +1,124 @@
+import fcntl
+import hashlib
+import json
+import os
+import pathlib
+
+from args import ARGS
+
+DEFAULT_DIR = pathlib.Path(os.environ.get('XDG_CACHE_HOME', '~/.cache')).expanduser() / 'pf-printer'
+
+ARGS.add_argument("--cache-dir", dest='cache_dir', type=pathlib.Path, default=DEFAULT_DIR)
+ARGS.add_argument("--cache-size", dest='cache_size', type=int, default=32, help="card cache size in MB")
+ARGS.add_argument("--no-cache", dest='no_cache', action="store_true")
+
+SOURCE_DIR = pathlib.Path(__file__).parent
+
+def escpos_capabilities():
+  # call before importing escpos.  It pickles its capability database into a
+  # new temp dir on every run unless told where to keep it, so the yaml was
+  # parsed again each time.
+  ARGS.cache_dir.mkdir(parents=True, exist_ok=True)
+  os.environ.setdefault('ESCPOS_CAPABILITIES_PICKLE_DIR', str(ARGS.cache_dir))
+
+def code_version():
+  # changing the layout code changes the output, so it is part of every key.
+  h = hashlib.sha256()
+  for p in sorted(SOURCE_DIR.glob('*.py')):
+    h.update(p.read_bytes())
+  return h.hexdigest()
+
+
+class CardCache:
+  # content addressed store of rendered ESC/POS programs, evicting the least
+  # recently used once over max_bytes.
+
+  def __init__(self, path: pathlib.Path, max_bytes: int):
+    self.path = path / 'cards'
+    self.stats_path = path / 'stats.json'
+    self.max_bytes = max_bytes
+    self.version = None
+
+  def key(self, source: bytes, *opts) -> str:
+    if not self.version:
+      self.version = code_version()
+    h = hashlib.sha256(source)
+    h.update(json.dumps([self.version, *opts]).encode())
+    return h.hexdigest()
+
+  def entry(self, key: str) -> pathlib.Path:
+    return self.path / key[:2] / key
+
+  def get(self, key: str) -> bytes | None:
+    p = self.entry(key)
+    try:
+      program = p.read_bytes()
+      os.utime(p)
+    except FileNotFoundError:
+      program = None
+    self.count('misses' if program is None else 'hits')
+    return program
+
+  def put(self, key: str, program: bytes):
+    p = self.entry(key)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.parent / f'{p.name}.{os.getpid()}.tmp'
+    tmp.write_bytes(program)
+    tmp.replace(p)
+    self.evict()
+
+  def entries(self):
+    ret = []
+    if not self.path.exists():
+      return ret
+    for d in os.scandir(self.path):
+      for e in os.scandir(d.path):
+        try:
+          st = e.stat()
+        except FileNotFoundError:
+          # evicted by another process meanwhile.
+          continue
+        ret.append((st.st_mtime, st.st_size, pathlib.Path(e.path)))
+    return ret
+
+  def evict(self):
+    entries = sorted(self.entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in entries:
+      if total <= self.max_bytes:
+        break
+      p.unlink(missing_ok=True)
+      total -= size
+
+  def clear(self):
+    for _, _, p in self.entries():
+      p.unlink(missing_ok=True)
+    self.stats_path.unlink(missing_ok=True)
+
+  def stats(self):
+    try:
+      stats = json.loads(self.stats_path.read_text())
+    except (FileNotFoundError, ValueError):
+      stats = {'hits': 0, 'misses': 0}
+    return stats
+
+  def count(self, what: str):
+    # print-batch --jobs counts from several processes at once, the lock file
+    # keeps their increments and the replace keeps readers from half a file.
+    self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(self.stats_path.with_suffix('.lock'), 'w') as lock:
+      fcntl.flock(lock, fcntl.LOCK_EX)
+      stats = self.stats()
+      stats[what] += 1
+      tmp = self.stats_path.with_suffix(f'.{os.getpid()}.tmp')
+      tmp.write_text(json.dumps(stats))
+      tmp.replace(self.stats_path)
+
+
+CARDS = None
+
+def cards() -> CardCache:
+  global CARDS
+  if not CARDS:
+    CARDS = CardCache(ARGS.cache_dir, ARGS.cache_size * 1024 * 1024)
+  return CARDS
@@ -0,0 +1,73 @@
+import glob
+import pathlib
+
+import glossary
+import packindex
+import rdata
+import stages
+from args import ARGS
+from creature import print_creature
+from item import print_item
+from rule import print_rule
+from spell import print_spell
+
+PRINTERS = {
+  'creature': print_creature,
+  'item': print_item,
+  'spell': print_spell,
+  'rule': print_rule,
+}
+
+def kind(data):
+  return packindex.kind(data['type'])
+
+def print_card(data, printer, kind_name=None):
+  with stages.stage('card'):
+    if not ARGS.show_glossary:
+      PRINTERS[kind_name or kind(data)](data, printer)
+      return
+    with glossary.collect() as links:
+      PRINTERS[kind_name or kind(data)](data, printer)
+    glossary.print_glossary(links, printer, skip=data['name'])
+
+def print_source(source: bytes, printer, kind_name=None):
+  # source is the raw json, the rendered card is cached on it.
+  if ARGS.show_glossary:
+    # the glossary comes from the files linked to, which the key doesn't cover.
+    print_card(rdata.parse(source), printer, kind_name)
+    return
+  opts = [kind_name, ARGS.show_details, ARGS.rank, ARGS.ranks]
+  printer.print_cached(source, opts, lambda: print_card(rdata.parse(source), printer, kind_name))
+
+def render_path(path, kind_name=None) -> bytes:
+  # a whole card as a Raw-able program, runs in a worker process.
+  import printer
+  with ARGS.override(print_stream=False), stages.entry(str(path)):
+    p = printer.Printer()
+    return p.compile_section(lambda: print_source(rdata.read_source_file(path), p, kind_name))
+
+def render_paths(paths, kind_name=None, jobs=None):
+  # cards laid out in a process pool, yielded in order as soon as each one
+  # and those before it are done.  Forked so the workers share the parsed
+  # ARGS and the scripts don't need a main guard.
+  from concurrent.futures import ProcessPoolExecutor
+  import multiprocessing
+  with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('fork')) as ex:
+    yield from ex.map(render_path, paths, [kind_name] * len(paths))
+
+def expand_paths(paths, kind_name=None):
+  # files as given, globs and directories expanded to their json files,
+  # anything else is looked up by name in the pack index.
+  ret = []
+  for p in paths:
+    if glob.has_magic(p):
+      ret.extend(sorted(pathlib.Path(g) for g in glob.glob(p, recursive=True)))
+      continue
+    p = pathlib.Path(p).expanduser()
+    if p.is_dir():
+      ret.extend(sorted(j for j in p.rglob('*.json') if not j.name.startswith('_')))
+    elif p.exists():
+      ret.append(p)
+    else:
+      ret.append(packindex.resolve(str(p), kind_name))
+  return ret
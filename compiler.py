@@ -0,0 +1,50 @@
+import cache
+cache.escpos_capabilities()
+
+from escpos import printer
+
+
+class Compiler(printer.Dummy):
+  # collects a whole job into one buffer.  set() is deferred until something
+  # is actually printed so changes that are undone before then, or that would
+  # not change the current printer state, are dropped.
+
+  def __init__(self, *args, state=None, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.state = dict(state or {})
+    self.pending = {}
+    # bytes waiting in the buffer, and a copy of everything written while
+    # recording is a list.
+    self.size = 0
+    self.recording = None
+
+  def set(self, **kwargs):
+    self.pending.update({k: v for k, v in kwargs.items() if v is not None})
+
+  def flush(self):
+    changed = {k: v for k, v in self.pending.items()
+               if k not in self.state or self.state[k] != v}
+    self.pending = {}
+    if changed:
+      self.state.update(changed)
+      super().set(**changed)
+
+  def text(self, txt):
+    # once a codepage is chosen, escpos writes ASCII as it is in all of them,
+    # but only after looking up every character on its own.
+    if txt and self.magic.encoding and not self.magic.disabled and txt.isascii():
+      self._raw(txt.encode('ascii'))
+    else:
+      super().text(txt)
+
+  def _raw(self, msg: bytes):
+    if self.pending:
+      self.flush()
+    super()._raw(msg)
+    self.size += len(msg)
+    if self.recording is not None:
+      self.recording.append(msg)
+
+  def clear(self):
+    super().clear()
+    self.size = 0
@@ -0,0 +1,157 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import cards
+import printer
+import rdata
+from args import ARGS
+from tandoor import fetch_recipe
+from tandoor import print_recipe
+
+ARGS.add_argument("--listen", default="127.0.0.1:8631")
+
+KINDS = ['card', *cards.PRINTERS.keys(), 'txt', 'tandoor']
+
+# job option -> ARGS dest, same meaning as the command line flags.
+OPTIONS = {
+  'details': 'show_details',
+  'glossary': 'show_glossary',
+  'rank': 'rank',
+  'ranks': 'ranks',
+  'font': 'print_font',
+  'width': 'text_width',
+}
+
+def validate(job):
+  if not isinstance(job, dict):
+    raise ValueError("job must be an object")
+  kind = job.get('kind')
+  if kind not in KINDS:
+    raise ValueError(f"unknown kind {kind}, expected one of: {KINDS}")
+  unknown = set(job.get('options', {})) - set(OPTIONS)
+  if unknown:
+    raise ValueError(f"unknown options: {sorted(unknown)}")
+  if kind == 'txt' and 'text' not in job:
+    raise ValueError("txt job needs text")
+  if kind == 'tandoor' and not ('url' in job and 'token' in job):
+    raise ValueError("tandoor job needs url and token")
+  if kind not in ['txt', 'tandoor'] and not ('json' in job or 'data' in job):
+    raise ValueError(f"{kind} job needs json or data")
+
+def job_printer(job):
+  kind = job['kind']
+  if kind == 'txt':
+    return lambda p: p.print(job['text'])
+  if kind == 'tandoor':
+    data = fetch_recipe(job['url'], job['token'])
+    return lambda p: print_recipe(data, p)
+
+  kind_name = None if kind == 'card' else kind
+  if 'data' in job:
+    data = rdata.to_rdict(job['data'])
+    return lambda p: cards.print_card(data, p, kind_name)
+  source = rdata.read_source_file(job['json'])
+  return lambda p: cards.print_source(source, p, kind_name)
+
+
+class Buffer:
+  # stands in for the printer while a job is laid out, it is sent in one go
+  # after.
+  def __init__(self, profile: str):
+    self.profile = profile
+    self.programs = []
+
+  def write(self, program: bytes):
+    self.programs.append(program)
+
+
+class Daemon:
+  # one worker per printer in the pool.  Jobs are laid out one at a time, ARGS
+  # holds their options, and printed in parallel.
+
+  def __init__(self, pool):
+    self.pool = pool
+    self.queue = queue.Queue()
+    self.ids = itertools.count(1)
+    self.layout_lock = threading.Lock()
+    self.done = 0
+    self.failed = 0
+
+  def submit(self, job):
+    validate(job)
+    job_id = next(self.ids)
+    self.queue.put((job_id, job))
+    return job_id
+
+  def status(self):
+    return {'pending': self.queue.qsize(), 'done': self.done, 'failed': self.failed,
+            'printers': self.pool.status()}
+
+  def layout(self, job, profile: str) -> bytes:
+    opts = {OPTIONS[k]: v for k, v in job.get('options', {}).items()}
+    buffer = Buffer(profile)
+    with self.layout_lock, ARGS.override(**opts):
+      fn = job_printer(job)
+      with printer.Printer(device=buffer) as p:
+        fn(p)
+    return b"".join(buffer.programs)
+
+  def run(self, job):
+    device = self.pool.acquire()
+    try:
+      program = self.layout(job, device.profile)
+      device = self.pool.write(device, program)
+    finally:
+      self.pool.release(device)
+
+  def work(self):
+    while True:
+      job_id, job = self.queue.get()
+      try:
+        self.run(job)
+        self.done += 1
+        logging.info("job %s done", job_id)
+      except Exception:
+        self.failed += 1
+        logging.exception("job %s failed: %s", job_id, job)
+      finally:
+        self.queue.task_done()
+
+  def serve(self, addr):
+    from device import parse_addr
+    for _ in self.pool.devices:
+      threading.Thread(target=self.work, daemon=True).start()
+    server = ThreadingHTTPServer(parse_addr(addr, default_port=8631), Handler)
+    server.jobs = self
+    logging.info("listening on %s:%s", *server.server_address)
+    server.serve_forever()
+
+
+class Handler(BaseHTTPRequestHandler):
+  def reply(self, code, body):
+    out = json.dumps(body).encode()
+    self.send_response(code)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(out)))
+    self.end_headers()
+    self.wfile.write(out)
+
+  def do_GET(self):
+    if self.path != '/jobs':
+      return self.reply(404, {'error': 'not found'})
+    self.reply(200, self.server.jobs.status())
+
+  def do_POST(self):
+    if self.path != '/jobs':
+      return self.reply(404, {'error': 'not found'})
+    try:
+      job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+      job_id = self.server.jobs.submit(job)
+    except ValueError as e:
+      return self.reply(400, {'error': str(e)})
+    self.reply(202, {'id': job_id, **self.server.jobs.status()})
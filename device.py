@@ -0,0 +1,147 @@
+import contextlib
+import logging
+import select
+import socket
+import threading
+
+import cache
+cache.escpos_capabilities()
+
+from escpos import printer
+from escpos.exceptions import DeviceNotFoundError
+
+ERRORS = (OSError, DeviceNotFoundError)
+
+def parse_addr(addr: str, default_port: int = 9100):
+  host, _, port = addr.partition(':')
+  return host, int(port) if port else default_port
+
+def parse_printers(spec: str, profile: str):
+  # "host[:port][@profile],..." to [(addr, profile)], profile is the default.
+  ret = []
+  for s in spec.split(','):
+    addr, _, p = s.strip().partition('@')
+    ret.append((addr, p or profile))
+  return ret
+
+
+class Device:
+  # one long-lived connection to a network printer, reopened on the next use
+  # after a connect or write failure.
+
+  def __init__(self, addr: str, profile: str):
+    self.host, self.port = parse_addr(addr)
+    self.profile = profile
+    self.printer = None
+    # one job at a time on the connection.
+    self.lock = threading.Lock()
+
+  def open(self):
+    if self.printer and not self.alive():
+      logging.info("printer %s:%s closed the connection, reconnecting", self.host, self.port)
+      self.close()
+    if not self.printer:
+      self.printer = printer.Network(self.host, port=self.port, profile=self.profile)
+      self.printer.open()
+    return self.printer
+
+  def alive(self) -> bool:
+    # a printer gone since the last job still takes the first write, but its
+    # socket reads as closed: readable with nothing to read.
+    sock = self.printer.device
+    try:
+      readable, _, _ = select.select([sock], [], [], 0)
+      return not readable or sock.recv(1, socket.MSG_PEEK) != b""
+    except (OSError, ValueError):
+      return False
+
+  def close(self):
+    if self.printer:
+      self.printer.close()
+      self.printer = None
+
+  @contextlib.contextmanager
+  def connection(self):
+    try:
+      yield self.open()
+    except ERRORS as e:
+      logging.warning("printer %s:%s failed: %s", self.host, self.port, e)
+      self.close()
+      raise
+
+  def run(self, fn, retries: int = 1):
+    for attempt in range(retries + 1):
+      try:
+        with self.connection() as p:
+          return fn(p)
+      except ERRORS:
+        if attempt >= retries:
+          raise
+
+  def write(self, program: bytes, retries: int = 1):
+    with self.lock:
+      self.run(lambda p: p._raw(program), retries=retries)
+
+
+class Pool:
+  # printers taking the same jobs.  A job goes to the least busy one, in turns
+  # among equals, and on to another one with the same profile if it can't be
+  # connected or written to.
+
+  def __init__(self, spec: str, profile: str):
+    self.devices = [Device(addr, p) for addr, p in parse_printers(spec, profile)]
+    self.busy = {d: 0 for d in self.devices}
+    self.turn = 0
+    self.lock = threading.Lock()
+
+  def acquire(self, profile: str = None, exclude=()) -> Device | None:
+    with self.lock:
+      n = len(self.devices)
+      order = [self.devices[(self.turn + i) % n] for i in range(n)]
+      free = [d for d in order if d not in exclude and (not profile or d.profile == profile)]
+      if not free:
+        return None
+      device = min(free, key=lambda d: self.busy[d])
+      self.turn = (self.devices.index(device) + 1) % n
+      self.busy[device] += 1
+      return device
+
+  def release(self, device: Device):
+    with self.lock:
+      self.busy[device] -= 1
+
+  def write(self, device: Device, program: bytes, retries: int = 1) -> Device:
+    try:
+      device.write(program, retries=retries)
+      return device
+    except ERRORS:
+      return self.failover(device, program, retries)
+
+  def failover(self, failed: Device, program: bytes, retries: int = 1) -> Device:
+    # the others with failed's profile in turn.  The one that printed it is
+    # returned acquired in place of failed, if none could failed still is.
+    tried = [failed]
+    while device := self.acquire(failed.profile, exclude=tried):
+      logging.warning("sending the job to %s:%s instead", device.host, device.port)
+      try:
+        device.write(program, retries=retries)
+      except ERRORS:
+        tried.append(device)
+        self.release(device)
+        continue
+      self.release(failed)
+      return device
+    raise DeviceNotFoundError(f"no printer left to take the job, tried {self.names(tried)}")
+
+  @staticmethod
+  def names(devices):
+    return ", ".join(f"{d.host}:{d.port}" for d in devices)
+
+  def status(self):
+    with self.lock:
+      return [{'printer': f"{d.host}:{d.port}", 'profile': d.profile, 'busy': self.busy[d]}
+              for d in self.devices]
+
+  def close(self):
+    for d in self.devices:
+      d.close()
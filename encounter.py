@@ -0,0 +1,62 @@
+from rich.segment import Segment
+from rich.segment import Segments
+from rich.style import Style
+
+import cards
+import creature
+import pf
+import rdata
+from formatting import com
+
+
+def parse_entry(arg: str):
+  # "goblin-warrior:4" -> ("goblin-warrior", 4)
+  name, sep, count = arg.rpartition(':')
+  if sep and count.isdigit():
+    return name, int(count)
+  return arg, 1
+
+def load(args):
+  # [(data, count)] in the order given, the same creature twice is counted once.
+  counts = {}
+  for arg in args:
+    name, count = parse_entry(arg)
+    for path in cards.expand_paths([name], 'creature'):
+      counts[path] = counts.get(path, 0) + count
+  return [(rdata.read_json_file(p), c) for p, c in counts.items()]
+
+def hp_boxes(hp, count: int, width: int):
+  # a box per creature to write its current hit points in.
+  box = "[" + " " * (len(str(hp)) + 2) + "]"
+  per_line = max(1, (width + 1) // (len(box) + 1))
+  return [" ".join([box] * min(per_line, count - n)) for n in range(0, count, per_line)]
+
+def print_encounter(creatures, printer):
+  # every creature with a compact header in one job, abilities are
+  # described once at the end.
+  glossary = {}
+  for data, count in creatures:
+    name = data['name'] + (f" x{count}" if count > 1 else "")
+    printer.print(Segments([Segment(name, Style(bold=True)), Segment.line()]))
+    creature.print_stats(data, printer)
+    for line in hp_boxes(data['system']['attributes']['hp']['value'], count, printer.width):
+      printer.print(line)
+    for i, heading in creature.print_items(data, printer):
+      html = pf.remove_macros_html(i['system']['description']['value'])
+      entry = glossary.setdefault((i['name'], html), [heading, html, []])
+      entry[2].append(data['name'])
+
+  names = {}
+  for name, _ in glossary:
+    names[name] = names.get(name, 0) + 1
+
+  printer.print_hr()
+  for (name, _), (heading, html, used_by) in glossary.items():
+    description = printer.description(html)
+    if not description:
+      continue
+    printer.print(heading)
+    if names[name] > 1:
+      # same name, different text: say whose it is.
+      printer.print(f"({com(*used_by)})")
+    printer.add(description)
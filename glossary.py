@@ -0,0 +1,70 @@
+import contextlib
+import re
+
+from rich.segment import Segment
+from rich.segment import Segments
+from rich.style import Style
+
+import lru
+import packindex
+import pf
+import rdata
+from args import ARGS
+
+ARGS.add_argument("--glossary", dest='show_glossary', action="store_true",
+                  help="end cards with the rules of the conditions, actions and spells they link to")
+
+# the first paragraph of a description is the rule itself for conditions and
+# actions, and what a spell does.
+FIRST_PARAGRAPH = re.compile(r"<p>.*?</p>", re.S)
+
+# rules text of linked entries by path, a batch links the same few over and
+# over.  Sized in characters.
+RULES = lru.LRU(1024 * 1024)
+
+
+@contextlib.contextmanager
+def collect():
+  # the @UUID links of everything printed meanwhile.
+  old = pf.UUID_LINKS
+  pf.UUID_LINKS = links = []
+  try:
+    yield links
+  finally:
+    pf.UUID_LINKS = old
+
+def entries(links, skip: str = None):
+  # what links point to, once each in order of first mention.
+  index = packindex.index()
+  found = {}
+  for uuid in links:
+    e = index.link(uuid)
+    if e and e.path not in found and e.name != skip:
+      found[e.path] = e
+  return list(found.values())
+
+def rules(e: packindex.Entry) -> str:
+  html = RULES.get(e.path)
+  if html is None:
+    try:
+      data = rdata.read_json_file(packindex.index().path(e))
+    except FileNotFoundError:
+      # gone since the index was refreshed, left out.
+      return ""
+    description = data['system']['description']['value']
+    m = FIRST_PARAGRAPH.search(description or "")
+    # links in the glossary itself are not followed.
+    with collect():
+      html = pf.remove_macros_html(m.group() if m else description or "")
+    RULES.put(e.path, html)
+  return html
+
+def print_glossary(links, printer, skip: str = None):
+  things = [(e.name, printer.description(rules(e))) for e in entries(links, skip)]
+  things = [(name, r) for name, r in things if r]
+  if not things:
+    return
+  printer.print_hr()
+  for name, r in things:
+    printer.print(Segments([Segment(name, Style(bold=True)), Segment.line()]))
+    printer.add(r)
@@ -0,0 +1,265 @@
+from html.parser import HTMLParser
+import re
+
+# lays out pf2e description html straight to lines of styled runs, without
+# going through markdownify, rich and the ANSI round trip.  The layout follows
+# what mdrender makes of the same html: no blank lines around paragraphs and
+# lists, " • " bullets, SIMPLE box tables.
+
+SPACE = re.compile(r"\s+")
+TAG = re.compile(r"<[^>]*>")
+BOLD = {'strong', 'b', 'em', 'i', 'th', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+BLOCK = {'p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'blockquote'}
+
+
+class Html:
+  def __init__(self, html: str):
+    self.html = html
+
+
+def has_text(html: str) -> bool:
+  return bool(html) and bool(TAG.sub("", html).strip())
+
+
+class Paragraph:
+  # marker is the bullet or number of a list item, '' for the rest.
+  def __init__(self, indent: int, marker: str | int):
+    self.indent = indent
+    self.marker = marker
+    self.runs = []
+
+
+class Table:
+  def __init__(self, indent: int):
+    self.indent = indent
+    self.rows = []
+
+
+class Parser(HTMLParser):
+  # html to a flat list of Paragraphs and Tables.  Runs are (text, bold, underline).
+
+  def __init__(self):
+    super().__init__(convert_charrefs=True)
+    self.blocks = []
+    self.bold = 0
+    self.underline = 0
+    self.lists = []
+    self.marker = None
+    self.paragraph = None
+    self.table = None
+    self.cell = None
+
+  def indent(self):
+    return sum(len(l[2]) for l in self.lists)
+
+  def end_paragraph(self):
+    self.paragraph = None
+
+  def runs(self):
+    if self.cell is not None:
+      return self.cell
+    if self.table:
+      return None
+    if not self.paragraph:
+      if self.marker is None:
+        self.paragraph = Paragraph(self.indent(), '')
+      else:
+        self.paragraph = Paragraph(self.indent() - len(self.lists[-1][2]), self.marker)
+        self.lists[-1][3].append(self.paragraph)
+      self.marker = None
+      self.blocks.append(self.paragraph)
+    return self.paragraph.runs
+
+  def handle_starttag(self, tag, attrs):
+    if tag in BOLD:
+      self.bold += 1
+    if tag == 'u':
+      self.underline += 1
+    if tag in BLOCK:
+      self.end_paragraph()
+    elif tag in ('ul', 'ol'):
+      self.end_paragraph()
+      # kind, items so far, indent of the items and their paragraphs.  An ol
+      # is numbered once its last number is known.
+      self.lists.append([tag, 0, "   ", []])
+    elif tag == 'li' and self.lists:
+      self.end_paragraph()
+      l = self.lists[-1]
+      l[1] += 1
+      self.marker = " • " if l[0] == 'ul' else l[1]
+    elif tag == 'table':
+      self.end_paragraph()
+      self.table = Table(self.indent())
+      self.blocks.append(self.table)
+    elif tag == 'tr' and self.table:
+      self.table.rows.append([])
+    elif tag in ('td', 'th') and self.table:
+      if not self.table.rows:
+        self.table.rows.append([])
+      self.cell = []
+      self.table.rows[-1].append(self.cell)
+
+  def handle_endtag(self, tag):
+    if tag in BOLD:
+      self.bold = max(0, self.bold - 1)
+    if tag == 'u':
+      self.underline = max(0, self.underline - 1)
+    if tag in BLOCK or tag == 'li':
+      self.end_paragraph()
+    elif tag in ('ul', 'ol') and self.lists:
+      self.end_paragraph()
+      kind, last, _, items = self.lists.pop()
+      if kind == 'ol':
+        self.number_items(items, last)
+    elif tag in ('td', 'th'):
+      self.cell = None
+    elif tag == 'table':
+      self.table = None
+
+  @staticmethod
+  def number_items(items, last: int):
+    # like rich: the number right aligned in len(last) + 1, then a space.
+    width = len(str(last)) + 2
+    for p in items:
+      p.marker = f"{p.marker}".rjust(width - 1) + " "
+
+  def handle_data(self, data):
+    data = SPACE.sub(" ", data)
+    runs = self.runs() if data.strip() or self.paragraph or self.cell else None
+    if runs is None:
+      return
+    if not runs:
+      data = data.lstrip()
+    if data:
+      runs.append((data, self.bold > 0, self.underline > 0))
+
+
+def words(runs):
+  # (word, bold, underline) with the spaces in front of a word as their own item
+  for text, bold, underline in runs:
+    for w in re.split(r"( )", text):
+      if w:
+        yield w, bold, underline
+
+def wrap(runs, width: int):
+  lines = [[]]
+  used = 0
+  for w, bold, underline in words(runs):
+    if w == " ":
+      if used and used < width:
+        lines[-1].append((w, bold, underline))
+        used += 1
+      continue
+    if used + len(w) > width and used:
+      while lines[-1] and lines[-1][-1][0] == " ":
+        lines[-1].pop()
+        used -= 1
+      lines.append([])
+      used = 0
+    while len(w) > width:
+      lines[-1].append((w[:width], bold, underline))
+      lines.append([])
+      w = w[width:]
+    lines[-1].append((w, bold, underline))
+    used += len(w)
+  while lines[-1] and lines[-1][-1][0] == " ":
+    lines[-1].pop()
+  return [l for l in lines if l] or [[]]
+
+def run_width(runs):
+  return sum(len(t) for t, _, _ in runs)
+
+def layout_paragraph(p: Paragraph, width: int):
+  prefix = [(" " * p.indent, False, False)] if p.indent else []
+  marker = [(p.marker, True, False)] if p.marker else []
+  pad = [(" " * len(p.marker), True, False)] if p.marker else []
+  ret = []
+  for first, line in enumerate(wrap(p.runs, max(1, width - p.indent - len(p.marker)))):
+    ret.append(prefix + (pad if first else marker) + line)
+  return ret
+
+def column_widths(rows, width: int):
+  cols = max(len(r) for r in rows)
+  widths = [max((run_width(r[c]) if c < len(r) else 0) for r in rows) for c in range(cols)]
+  # edges and padding, then take from the widest columns until it fits.
+  room = width - (2 + 2 * (cols - 1))
+  while sum(widths) > room and max(widths) > 1:
+    widest = max(widths)
+    widths[widths.index(widest)] = widest - 1
+  return widths
+
+def layout_table(t: Table, width: int):
+  rows = [r for r in t.rows if r]
+  if not rows:
+    return []
+  width -= t.indent
+  widths = column_widths(rows, width)
+  total = 2 + sum(widths) + 2 * (len(widths) - 1)
+  prefix = [(" " * t.indent, False, False)] if t.indent else []
+  blank = prefix + [(" " * total, False, False)]
+
+  ret = [blank]
+  for num, row in enumerate(rows):
+    header = num == 0
+    cells = [wrap(row[c] if c < len(row) else [], widths[c]) for c in range(len(widths))]
+    for i in range(max(len(c) for c in cells)):
+      line = prefix + [(" ", False, False)]
+      for c, w in enumerate(widths):
+        runs = cells[c][i] if i < len(cells[c]) else []
+        if header:
+          runs = [(t, True, u) for t, _, u in runs]
+        line.extend(runs)
+        fill = w - run_width(runs)
+        if c < len(widths) - 1:
+          line.append((" " * fill + " ", header, False))
+          line.append((" ", False, False))
+        else:
+          line.append((" " * fill + " ", False, False))
+      ret.append(line)
+    if header:
+      ret.append(prefix + [(" " + "─" * (total - 2) + " ", False, False)])
+  ret.append(blank)
+  return ret
+
+def merge(line):
+  # neighbouring runs in the same style as one.
+  ret = []
+  for text, bold, underline in line:
+    if ret and ret[-1][1:] == (bold, underline):
+      ret[-1] = (ret[-1][0] + text, bold, underline)
+    else:
+      ret.append((text, bold, underline))
+  return ret
+
+def layout(html: str, width: int):
+  # lines of (text, bold, underline) runs, none longer than width.
+  parser = Parser()
+  parser.feed(html)
+  parser.close()
+  ret = []
+  for b in parser.blocks:
+    if isinstance(b, Table):
+      # tables are the one block rich puts an empty line in front of.
+      if ret:
+        ret.append([])
+      ret.extend(layout_table(b, width))
+    elif b.runs:
+      ret.extend(layout_paragraph(b, width))
+  return [merge(l) for l in ret]
+
+def render(lines, printer):
+  for line in lines:
+    for text, bold, underline in line:
+      printer.set(bold=bold, underline=underline)
+      printer.text(text)
+    printer.text("\n")
+  printer.set(bold=False, underline=False)
+
+def render_ansi(lines) -> str:
+  out = []
+  for line in lines:
+    for text, bold, underline in line:
+      codes = ("1;" if bold else "") + ("4;" if underline else "")
+      out.append(f"\x1b[{codes[:-1]}m{text}\x1b[0m" if codes else text)
+    out.append("\n")
+  return "".join(out)
@@ -0,0 +1,41 @@
+import collections
+
+
+class LRU:
+  # a dict bounded by the summed size of its entries, dropping the least
+  # recently used first.
+
+  def __init__(self, max_size: int, size=len):
+    self.max_size = max_size
+    self.size = size
+    self.entries = collections.OrderedDict()
+    self.used = 0
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key, default=None):
+    try:
+      value, _ = self.entries[key]
+    except KeyError:
+      self.misses += 1
+      return default
+    self.entries.move_to_end(key)
+    self.hits += 1
+    return value
+
+  def put(self, key, value, size: int = None):
+    if size is None:
+      size = self.size(value)
+    if size > self.max_size:
+      return value
+    if key in self.entries:
+      self.used -= self.entries.pop(key)[1]
+    self.entries[key] = (value, size)
+    self.used += size
+    while self.used > self.max_size:
+      _, (_, s) = self.entries.popitem(last=False)
+      self.used -= s
+    return value
+
+  def __len__(self):
+    return len(self.entries)
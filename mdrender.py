@@ -0,0 +1,39 @@
+from rich.console import Console
+from rich.console import ConsoleOptions
+from rich.console import RenderResult
+from rich.markdown import ListElement
+from rich.markdown import ListItem
+from rich.markdown import Markdown
+from rich.markdown import Paragraph
+from rich.markdown import TableElement
+import rich.box
+
+Paragraph.new_line = False
+ListElement.new_line = False
+ListItem.new_line = False
+
+ASCII_SIMPLE_BOX = rich.box.Box(
+    "    \n"
+    "    \n"
+    " -- \n"
+    "    \n"
+    "    \n"
+    " -- \n"
+    "    \n"
+    "    \n",
+    ascii=True,
+)
+
+class MyTableElement(TableElement):
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+  def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+    for table in super().__rich_console__(console, options):
+      #table.box = ASCII_SIMPLE_BOX
+      table.box = rich.box.SIMPLE
+      yield table
+
+def markdown(markup):
+  md = Markdown(markup)
+  md.elements["table_open"] = MyTableElement
+  return md
@@ -0,0 +1,233 @@
+import difflib
+import json
+import os
+import pathlib
+import sys
+from collections import namedtuple
+
+import cache  # for --cache-dir
+from args import ARGS
+from rdata import loads
+
+ARGS.add_argument("--pf2e", dest='pf2e_path', type=pathlib.Path,
+                  default=pathlib.Path(os.environ.get('PF2E_DIR', '~/3src/pf2e')).expanduser(),
+                  help="pf2e checkout, used to look things up by name")
+
+INDEX_VERSION = 2
+
+# compendium names that aren't their directory under packs/.
+PACK_FOLDERS = {
+  'conditionitems': 'conditions',
+  'actionspf2e': 'actions',
+  'spells-srd': 'spells',
+  'equipment-srd': 'equipment',
+  'feats-srd': 'feats',
+}
+
+Entry = namedtuple('Entry', ['name', 'slug', 'type', 'level', 'traits', 'id', 'path'])
+
+# physical items, what print_item lays out.
+ITEM_TYPES = {'armor', 'weapon', 'shield', 'equipment', 'consumable', 'treasure',
+              'backpack', 'kit', 'book', 'ammo'}
+
+def kind(typ):
+  if typ == 'npc':
+    return 'creature'
+  elif typ == 'spell':
+    return 'spell'
+  elif typ in ITEM_TYPES:
+    return 'item'
+  # conditions, actions, feats and the like.
+  return 'rule'
+
+def slugify(name):
+  return ''.join(c if c.isalnum() else '-' for c in name.lower()).strip('-')
+
+def level(stm):
+  for lvl in [stm.get('level'), (stm.get('details') or {}).get('level')]:
+    if isinstance(lvl, dict) and lvl.get('value') is not None:
+      return lvl['value']
+  return None
+
+def describe(path):
+  with open(path, 'rb') as f:
+    data = loads(f.read())
+  stm = data.get('system') or {}
+  traits = (stm.get('traits') or {}).get('value') or []
+  return [
+    data.get('name', ''),
+    stm.get('slug') or slugify(data.get('name', path.stem)),
+    data.get('type', ''),
+    level(stm),
+    traits if isinstance(traits, list) else [],
+    data.get('_id', ''),
+  ]
+
+
+class PackIndex:
+  # name/slug/type/level/traits of every document in the pf2e packs, so
+  # lookups don't need to walk and parse the whole checkout.
+
+  def __init__(self, packs: pathlib.Path, index_path: pathlib.Path):
+    self.packs = packs
+    self.index_path = index_path
+    self.files = {}
+    self._names = None
+    self._refs = None
+
+  def load(self):
+    try:
+      index = loads(self.index_path.read_bytes())
+    except FileNotFoundError:
+      return False
+    if index.get('version') != INDEX_VERSION or index.get('packs') != str(self.packs):
+      return False
+    self.files = index['files']
+    self._names = None
+    self._refs = None
+    return True
+
+  def save(self):
+    self.index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = self.index_path.with_suffix('.tmp')
+    tmp.write_text(json.dumps({
+      'version': INDEX_VERSION,
+      'packs': str(self.packs),
+      'files': dict(sorted(self.files.items())),
+      }, separators=(',', ':')))
+    tmp.replace(self.index_path)
+
+  def scan(self, d=None):
+    for e in os.scandir(d or self.packs):
+      if e.is_dir():
+        yield from self.scan(e.path)
+      elif e.name.endswith('.json') and not e.name.startswith('_'):
+        yield e
+
+  def refresh(self):
+    # only files that are new or have a different mtime are parsed again.
+    if not self.packs.is_dir():
+      raise Exception(f"pf2e packs not found: {self.packs}, see --pf2e")
+    old = self.files
+    files = {}
+    parsed = 0
+    for e in self.scan():
+      rel = os.path.relpath(e.path, self.packs)
+      mtime = e.stat().st_mtime_ns
+      prev = old.get(rel)
+      if prev and prev[0] == mtime:
+        files[rel] = prev
+        continue
+      try:
+        files[rel] = [mtime, *describe(pathlib.Path(e.path))]
+        parsed += 1
+      except (ValueError, OSError) as err:
+        print(f"skipping {rel}: {err}", file=sys.stderr)
+    changed = parsed or len(files) != len(old)
+    self.files = files
+    self._names = None
+    self._refs = None
+    if changed:
+      self.save()
+    return parsed
+
+  def ensure(self):
+    if not self.load():
+      self.refresh()
+    return self
+
+  def names(self):
+    # (lower case name, slug, relative path) for the slower searches.
+    if self._names is None:
+      self._names = [(v[1].lower(), v[2], rel) for rel, v in self.files.items()]
+    return self._names
+
+  def refs(self):
+    # _id and lower case name -> relative paths, for @UUID links.
+    if self._refs is None:
+      self._refs = {}
+      for rel, v in self.files.items():
+        for key in {v[6], v[1].lower()}:
+          if key:
+            self._refs.setdefault(key, []).append(rel)
+    return self._refs
+
+  def link(self, uuid: str) -> Entry | None:
+    # Compendium.pf2e.<pack>[.Item].<_id or name>, what @UUID points to.
+    parts = uuid.split('.')
+    if len(parts) < 4 or parts[0] != 'Compendium':
+      return None
+    e = self.find_link(parts[2], parts[-1])
+    if e and not self.path(e).exists():
+      # checkout moved on since the index was built.
+      self.refresh()
+      e = self.find_link(parts[2], parts[-1])
+    return e
+
+  def find_link(self, pack: str, key: str) -> Entry | None:
+    rels = self.refs().get(key) or self.refs().get(key.lower()) or []
+    if not rels:
+      return None
+    # names can be in several packs, the pack dir names are close enough to
+    # the compendium names.
+    folder = PACK_FOLDERS.get(pack, pack)
+    rels = sorted(rels, key=lambda rel: folder not in rel.split(os.sep)[:-1])
+    return self.entry(rels[0])
+
+  def entry(self, rel) -> Entry:
+    return Entry._make(self.files[rel][1:] + [rel])
+
+  def path(self, e: Entry) -> pathlib.Path:
+    return self.packs / e.path
+
+  def search(self, query, kind_name=None, limit=20):
+    # exact name or slug, then prefix, then substring, then fuzzy.
+    q = query.lower().strip()
+    ok = lambda rel: not kind_name or kind(self.files[rel][3]) == kind_name
+    found = lambda rels: [self.entry(rel) for rel in rels[:limit]]
+
+    # straight off the loaded rows, the common case shouldn't pay for more.
+    exact = [rel for rel, v in self.files.items() if (v[2] == q or v[1].lower() == q) and ok(rel)]
+    if exact:
+      return found(exact)
+    names = self.names()
+    shortest = lambda rels: sorted(rels, key=lambda rel: (len(self.files[rel][1]), rel))
+    prefix = [rel for n, slug, rel in names if (n.startswith(q) or slug.startswith(q)) and ok(rel)]
+    if prefix:
+      return found(shortest(prefix))
+    sub = [rel for n, _, rel in names if q in n and ok(rel)]
+    if sub:
+      return found(shortest(sub))
+
+    # typos in the first letter are rare enough, and comparing against every
+    # name in the packs takes a second.
+    candidates = {n for n, _, rel in names if n[:1] == q[:1] and ok(rel)}
+    close = difflib.get_close_matches(q, candidates, n=limit, cutoff=0.6)
+    return found(sorted((rel for n, _, rel in names if n in close and ok(rel)),
+                        key=lambda rel: close.index(self.files[rel][1].lower())))
+
+  def resolve(self, query, kind_name=None):
+    found = self.search(query, kind_name)
+    if found and not self.path(found[0]).exists():
+      # checkout moved on since the index was built.
+      self.refresh()
+      found = self.search(query, kind_name)
+    if not found:
+      raise Exception(f"nothing found for: {query}")
+    if len(found) > 1:
+      others = ", ".join(e.path for e in found[1:5])
+      print(f"{query}: using {found[0].path}, also matches: {others}", file=sys.stderr)
+    return self.path(found[0])
+
+
+INDEX = None
+
+def index() -> PackIndex:
+  global INDEX
+  if not INDEX:
+    INDEX = PackIndex(ARGS.pf2e_path.expanduser() / 'packs', ARGS.cache_dir / 'pack-index.json')
+    INDEX.ensure()
+  return INDEX
+
+def resolve(query, kind_name=None):
+  return index().resolve(query, kind_name)
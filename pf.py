@@ -2,6 +2,7 @@ import re
 
 import dice
 import pf_icons
+import stages
 from formatting import com
 from formatting import space
 from udchar import Udchars
@@ -63,99 +64,156 @@ def level(l, letter="L"):
 def remove_macros_html(text):
   return remove_macros(text, lambda t: f"<strong>{t}</strong>")
 
-def remove_macros(text, formatter=None):
+# start of @Name[ or [[/name macros, the rest is found by bracket matching
+# since arguments nest: @Damage[(1d10+2)[piercing]]
+MACRO = re.compile(r"@(\w+)\[|\[\[/(\w+)\s")
+BRACKET = re.compile(r"[\[\]]")
+LABEL = re.compile(r"\{([^}]*)\}")
+
+@stages.timed('macros')
+def remove_macros(text, formatter=None, at_macros=None, slash_macros=None):
+  # one pass over text, each known macro replaced by formatter(decoded) and
+  # unknown ones left as they are.
+  if not text:
+    return text
   if not formatter:
     formatter = lambda t: t
-
-  text = remove_at_macros(text, formatter)
-  text = remove_slash_macros(text, formatter)
-  return text
-
-def remove_at_macros(text, formatter):
-  matches = re.finditer(r"@([^[]+)\[([^\]]+)\](?:\{([^}]+)\})?", text)
-  for m in reversed(list(matches)):
-    # @a[b]{c}
-    a = m.group(1)
-    b = m.group(2)
-    c = m.group(3)
-
-    # @Check[reflex|dc:21]
-    # @Check[fortitude|dc:33|basic|options:area-effect]
-    if a == "Check":
-      p = b.split('|')
-      rep = p[0]
-      if len(p) >= 2:
-        rep += f"/{p[1]}"
-
-    # @UUID[Compendium.pf2e.conditionitems.Item.Confused]
-    # @UUID[Compendium.pf2e.spells-srd.Item.Illusory Disguise]
-    # @UUID[Compendium.pf2e.actionspf2e.Item.Trip]{Trips}
-    elif a == "UUID":
-      if c:
-        rep = c
-      else:
-        rep = b.rsplit('.', maxsplit=1)[1]
-
-    # @Localize[PF2E.NPC.Abilities.Glossary.Push]
-    elif a == "Localize":
-      rep = ""
-
-    # TODO decode these better
-    # @Damage[(1d10+2)[piercing]]
-    # @Damage[(@item.level)[bleed]]
-    # @Damage[2d6[persistent,bleed]]
-    # deals @Damage[18d6[poison]|options:area-damage] damage
-    elif a == "Damage":
-      rep = b
-
-    # @Template[cone|distance:50]
-    # @Template[emanation|distance:30]{30 feet}
-    # in a @Template[type:cone|distance:30] take
-    elif a == "Template":
-      if c:
-        rep = c
-      else:
-        p = b.split('|')
-        rep = f"{p[0].replace('type:', '')}/{p[1]}"
-    else:
-      continue
-    text = text[:m.start()] + formatter(rep) + text[m.end():]
-  return text
-
-def remove_slash_macros(text, formatter):
-  matches = re.finditer(r"\[\[/([^ ]+)([^\]]+)]](?:\{([^}]+)\})?", text)
-  for m in reversed(list(matches)):
-    # [[/a b]]{c}
-    a = m.group(1)
-    b = m.group(2)
-    c = m.group(3)
-
-    # [[/gmr 1d4 #hours]]{1d4 hours}
-    # [[/gmr 1d4 #Recharge Poison Breath]]{1d4 rounds}
-    if a == "gmr":
-      rep = c if c else b
-
-    # [[/act trip]]
-    # [[/act force-open dc=23]]{Forces Open}
-    # [[/act grapple skill=diplomacy]]{Grapple}
-    elif a == "act":
-      rep = c if c else b
-
-    # [[/br 2d4 #hours]]{2d4 hours}
-    # [[/br 2d4 #Recharge Corrosive Breath or Double Breath]]{2d4 rounds}
-    elif a == "br":
-      rep = c if c else b
-
-    # within [[/r 10d10 #Miles Off]] miles
-    # additional [[/r {2d10}]]{2d10 damage} to that
-    # with a [[/r 1d20+17 #Counteract]]{+17} counteract
-    elif a == "r":
-      if c:
-        rep = c
-      else:
-        rep = b.split(' ')[0]
-
-    else:
+  at_macros = at_macros or AT_MACROS
+  slash_macros = slash_macros or SLASH_MACROS
+
+  out = []
+  pos = 0
+  while m := MACRO.search(text, pos):
+    slash = m.group(2) is not None
+    decode = slash_macros.get(m.group(2)) if slash else at_macros.get(m.group(1))
+    end = closing_bracket(text, m.end(), 2 if slash else 1)
+    if not decode or end is None:
+      out.append(text[pos:m.end()])
+      pos = m.end()
       continue
-    text = text[:m.start()] + formatter(rep) + text[m.end():]
-  return text
+
+    # @a[b]{c} or [[/a b]]{c}
+    b = text[m.end():end - (2 if slash else 1)]
+    c = None
+    label = LABEL.match(text, end)
+    if label:
+      c = label.group(1)
+      end = label.end()
+
+    out.append(text[pos:m.start()])
+    out.append(formatter(decode(b, c)))
+    pos = end
+  out.append(text[pos:])
+  return ''.join(out)
+
+def closing_bracket(text, pos, depth):
+  # index just after the bracket that closes depth open ones.
+  for m in BRACKET.finditer(text, pos):
+    depth += 1 if m.group() == '[' else -1
+    if depth == 0:
+      return m.end()
+  return None
+
+def split_top(text, sep):
+  # split on sep outside of brackets and parens.
+  parts = []
+  depth = 0
+  start = 0
+  for i, ch in enumerate(text):
+    if ch in '[(':
+      depth += 1
+    elif ch in '])':
+      depth -= 1
+    elif ch == sep and depth == 0:
+      parts.append(text[start:i])
+      start = i + 1
+  parts.append(text[start:])
+  return parts
+
+# @Check[reflex|dc:21]
+# @Check[fortitude|dc:33|basic|options:area-effect]
+def at_check(b, c):
+  p = b.split('|')
+  rep = p[0]
+  if len(p) >= 2:
+    rep += f"/{p[1]}"
+  return rep
+
+# what the @UUID macros removed meanwhile linked to, while a list.
+UUID_LINKS = None
+
+# @UUID[Compendium.pf2e.conditionitems.Item.Confused]
+# @UUID[Compendium.pf2e.spells-srd.Item.Illusory Disguise]
+# @UUID[Compendium.pf2e.actionspf2e.Item.Trip]{Trips}
+def at_uuid(b, c):
+  if UUID_LINKS is not None:
+    UUID_LINKS.append(b)
+  if c:
+    return c
+  return b.rsplit('.', maxsplit=1)[-1]
+
+# @Localize[PF2E.NPC.Abilities.Glossary.Push]
+def at_localize(b, c):
+  return ""
+
+# @Damage[(1d10+2)[piercing]]
+# @Damage[(@item.level)[bleed]]
+# @Damage[2d6[persistent,bleed]]
+# deals @Damage[18d6[poison]|options:area-damage] damage
+# @Damage[2d6[fire],1d6[persistent,fire]]
+def at_damage(b, c):
+  if c:
+    return c
+  rolls = []
+  for roll in split_top(split_top(b, '|')[0], ','):
+    formula, _, types = roll.partition('[')
+    formula = formula.strip()
+    if formula.startswith('(') and formula.endswith(')'):
+      formula = formula[1:-1]
+    rolls.append(space(formula, types.rstrip(']').replace(',', ' ')))
+  return " + ".join(rolls)
+
+# @Template[cone|distance:50]
+# @Template[emanation|distance:30]{30 feet}
+# in a @Template[type:cone|distance:30] take
+def at_template(b, c):
+  if c:
+    return c
+  p = b.split('|')
+  rep = p[0].replace('type:', '')
+  if len(p) >= 2:
+    rep += f"/{p[1]}"
+  return rep
+
+# [[/gmr 1d4 #hours]]{1d4 hours}
+# [[/gmr 1d4 #Recharge Poison Breath]]{1d4 rounds}
+# [[/act trip]]
+# [[/act force-open dc=23]]{Forces Open}
+# [[/act grapple skill=diplomacy]]{Grapple}
+# [[/br 2d4 #hours]]{2d4 hours}
+# [[/br 2d4 #Recharge Corrosive Breath or Double Breath]]{2d4 rounds}
+def slash_label_or_all(b, c):
+  return c if c else b.strip()
+
+# within [[/r 10d10 #Miles Off]] miles
+# additional [[/r {2d10}]]{2d10 damage} to that
+# with a [[/r 1d20+17 #Counteract]]{+17} counteract
+def slash_roll(b, c):
+  if c:
+    return c
+  return b.split()[0].strip('{}')
+
+AT_MACROS = {
+  'Check': at_check,
+  'UUID': at_uuid,
+  'Localize': at_localize,
+  'Damage': at_damage,
+  'Template': at_template,
+}
+
+SLASH_MACROS = {
+  'gmr': slash_label_or_all,
+  'act': slash_label_or_all,
+  'br': slash_label_or_all,
+  'r': slash_roll,
+}
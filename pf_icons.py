@@ -1,191 +1,58 @@
+# generated by ./build-icons from icons/, edit those and run it again.
 from udchar import Udchars
 
-ACTIONS_FREE = Udchars("free", 9, 24,
-    #0         0         0         0    5
-    "                                    "  #  0
-    "                                    "  #  1
-    "                                    "  #  2
-    "                                    "  #  3
-    "                                    "  #  4
-    "                                    "  #  5
-    "                                    "  #  6
-    "                                    "  #  7
-    "       xx                           "  #  8
-    "      xxxx                          "  #  9
-    "     xx  xx                         "  # 10
-    "    xx    xx                        "  # 11
-    "   xxx     xx                       "  # 12
-    "  xxxxx     xx                      "  # 13
-    " xx  xxx     xx                     "  # 14
-    "xx    xxx     xx                    "  # 15
-    "xx    xxx     xx                    "  # 16
-    " xx  xxx     xx                     "  # 17
-    "  xxxxx     xx                      "  # 18
-    "   xxx     xx                       "  # 19
-    "    xx    xx                        "  # 20
-    "     xx  xx                         "  # 21
-    "      xxxx                          "  # 22
-    "       xx                           "  # 23
-    )
-ACTIONS_1 = Udchars("   *", 9, 24,
-    #0         0         0         0    5
-    "                                    "  #  0
-    "                                    "  #  1
-    "                                    "  #  2
-    "                                    "  #  3
-    "                                    "  #  4
-    "                                    "  #  5
-    "                                    "  #  6
-    "                                    "  #  7
-    "       xx                           "  #  8
-    "      xxxx                          "  #  9
-    "     xxxxxx                         "  # 10
-    "    xxxxxxxx                        "  # 11
-    "   xxxxxxxxxx                       "  # 12
-    "    xxxxxxxxxx                      "  # 13
-    " xx  xxxxxxxxxx                     "  # 14
-    "xxxx  xxxxxxxxxx                    "  # 15
-    "xxxx  xxxxxxxxxx                    "  # 16
-    " xx  xxxxxxxxxx                     "  # 17
-    "    xxxxxxxxxx                      "  # 18
-    "   xxxxxxxxxx                       "  # 19
-    "    xxxxxxxx                        "  # 20
-    "     xxxxxx                         "  # 21
-    "      xxxx                          "  # 22
-    "       xx                           "  # 23
-    )
-ACTIONS_2 = Udchars("  **", 9, 24,
-    #0         0         0         0    5
-    "                                    "  #  0
-    "                                    "  #  1
-    "                                    "  #  2
-    "                                    "  #  3
-    "                                    "  #  4
-    "                                    "  #  5
-    "                                    "  #  6
-    "                                    "  #  7
-    "       xx                           "  #  8
-    "      xxxx        xx                "  #  9
-    "     xxxxxx      xxxx               "  # 10
-    "    xxxxxxxx    xxxxxx              "  # 11
-    "   xxxxxxxxxx  xxxxxxxx             "  # 12
-    "    xxxxxxxxxx  xxxxxxxx            "  # 13
-    " xx  xxxxxxxxxx  xxxxxxxx           "  # 14
-    "xxxx  xxxxxxxxxx  xxxxxxxx          "  # 15
-    "xxxx  xxxxxxxxxx  xxxxxxxx          "  # 16
-    " xx  xxxxxxxxxx  xxxxxxxx           "  # 17
-    "    xxxxxxxxxx  xxxxxxxx            "  # 18
-    "   xxxxxxxxxx  xxxxxxxx             "  # 19
-    "    xxxxxxxx    xxxxxx              "  # 20
-    "     xxxxxx      xxxx               "  # 21
-    "      xxxx        xx                "  # 22
-    "       xx                           "  # 23
-    )
-ACTIONS_3 = Udchars(" ***", 9, 24,
-    #0         0         0         0    5
-    "                                    "  #  0
-    "                                    "  #  1
-    "                                    "  #  2
-    "                                    "  #  3
-    "                                    "  #  4
-    "                                    "  #  5
-    "                                    "  #  6
-    "                                    "  #  7
-    "       xx                           "  #  8
-    "      xxxx        xx                "  #  9
-    "     xxxxxx      xxxx        xx     "  # 10
-    "    xxxxxxxx    xxxxxx      xxxx    "  # 11
-    "   xxxxxxxxxx  xxxxxxxx    xxxxxx   "  # 12
-    "    xxxxxxxxxx  xxxxxxxx  xxxxxxxx  "  # 13
-    " xx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx "  # 14
-    "xxxx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx"  # 15
-    "xxxx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx"  # 16
-    " xx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx "  # 17
-    "    xxxxxxxxxx  xxxxxxxx  xxxxxxxx  "  # 18
-    "   xxxxxxxxxx  xxxxxxxx    xxxxxx   "  # 19
-    "    xxxxxxxx    xxxxxx      xxxx    "  # 20
-    "     xxxxxx      xxxx        xx     "  # 21
-    "      xxxx        xx                "  # 22
-    "       xx                           "  # 23
-    )
-ACTIONS_123 = Udchars("  */**/***", 9, 24,
-    #0         0         0         0         0         0         0         0         0        9
-    "                                                                                          "  #  0
-    "                                                                                          "  #  1
-    "                                                                                          "  #  2
-    "                                                                                          "  #  3
-    "                                                                                          "  #  4
-    "                                                                                          "  #  5
-    "                                                                                          "  #  6
-    "                                                                                          "  #  7
-    "       xx                   xx                             xx                             "  #  8
-    "      xxxx                 xxxx        xx                 xxxx        xx                  "  #  9
-    "     xxxxxx               xxxxxx      xxxx               xxxxxx      xxxx        xx       "  # 10
-    "    xxxxxxxx             xxxxxxxx    xxxxxx             xxxxxxxx    xxxxxx      xxxx      "  # 11
-    "   xxxxxxxxxx           xxxxxxxxxx  xxxxxxxx           xxxxxxxxxx  xxxxxxxx    xxxxxx     "  # 12
-    "    xxxxxxxxxx           xxxxxxxxxx  xxxxxxxx           xxxxxxxxxx  xxxxxxxx  xxxxxxxx    "  # 13
-    " xx  xxxxxxxxxx       xx  xxxxxxxxxx  xxxxxxxx       xx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx   "  # 14
-    "xxxx  xxxxxxxxxx     xxxx  xxxxxxxxxx  xxxxxxxx     xxxx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx  "  # 15
-    "xxxx  xxxxxxxxxx     xxxx  xxxxxxxxxx  xxxxxxxx     xxxx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx  "  # 16
-    " xx  xxxxxxxxxx       xx  xxxxxxxxxx  xxxxxxxx       xx  xxxxxxxxxx  xxxxxxxx  xxxxxxxx   "  # 17
-    "    xxxxxxxxxx           xxxxxxxxxx  xxxxxxxx           xxxxxxxxxx  xxxxxxxx  xxxxxxxx    "  # 18
-    "   xxxxxxxxxx           xxxxxxxxxx  xxxxxxxx           xxxxxxxxxx  xxxxxxxx    xxxxxx     "  # 19
-    "    xxxxxxxx             xxxxxxxx    xxxxxx             xxxxxxxx    xxxxxx      xxxx      "  # 20
-    "     xxxxxx               xxxxxx      xxxx               xxxxxx      xxxx        xx       "  # 21
-    "      xxxx                 xxxx        xx                 xxxx        xx                  "  # 22
-    "       xx                   xx                             xx                             "  # 23
-    )
-ACTIONS_REACTION = Udchars("  <-", 9, 24,
-    #0         0         0         0    5
-    "                                    "  #  0
-    "                                    "  #  1
-    "                                    "  #  2
-    "                                    "  #  3
-    "                                    "  #  4
-    "                                    "  #  5
-    "                                    "  #  6
-    "         xxxxxxxxxx                 "  #  7
-    "      xxxxxxxxxxxxxxxx              "  #  8
-    "    xxxxxx    xxxxxxxxxx            "  #  9
-    "   xxxx          xxxxxxxx           "  # 10
-    "  xxx              xxxxxxx          "  # 11
-    " xx                 xxxxxx          "  # 12
-    "x                    xxxxxx         "  # 13
-    "                      xxxxx         "  # 14
-    "                      xxxxx         "  # 15
-    "                      xxxxx         "  # 16
-    "          xxxxx      xxxxx          "  # 17
-    "        xxxxxx     xxxxxxx          "  # 18
-    "      xxxxxxxxxxxxxxxxxx            "  # 19
-    "     xxxxxxxxxxxxxxxxx              "  # 20
-    "      xxxxxxxxxxxxx                 "  # 21
-    "        xxxxxx                      "  # 22
-    "          xxxxx                     "  # 23
-    )
-ACTIONS_REACTION_BIG = Udchars("  <-", 9, 24,
-    #0         0         0         0    5
-    "         xxxxxxxxxxx                "  #  0
-    "      xxxxxxxxxxxxxxxxx             "  #  1
-    "    xxxxxxxxxxxxxxxxxxxxx           "  #  2
-    "   xxxxxx    xxxxxxxxxxxxx          "  #  3
-    "  xxxx           xxxxxxxxxx         "  #  4
-    " xx                xxxxxxxxx        "  #  5
-    "x                   xxxxxxxxx       "  #  6
-    "                     xxxxxxxx       "  #  7
-    "                      xxxxxxxx      "  #  8
-    "                      xxxxxxxx      "  #  9
-    "                       xxxxxxx      "  # 10
-    "                       xxxxxxx      "  # 11
-    "                       xxxxxxx      "  # 12
-    "                       xxxxxx       "  # 13
-    "                      xxxxxxx       "  # 14
-    "            xxxxx     xxxxxx        "  # 15
-    "          xxxxxx     xxxxxx         "  # 16
-    "        xxxxxxx    xxxxxxx          "  # 17
-    "      xxxxxxxxxxxxxxxxxx            "  # 18
-    "     xxxxxxxxxxxxxxxxx              "  # 19
-    "      xxxxxxxxxxxxxx                "  # 20
-    "        xxxxxxx                     "  # 21
-    "          xxxxxx                    "  # 22
-    "            xxxxx                   "  # 23
-    )
+ACTIONS_1 = Udchars.compiled('   *', {
+  'b': (9,
+    b'\x00\x01\x80\x00\x03\xc0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|\x00\x7f\xfe\x00\xff\xff\x00\xff\xff'
+    b'\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\x01\x80\x00\x00\x00\x00\x00\x00'
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+})
+ACTIONS_123 = Udchars.compiled('  */**/***', {
+  'b': (9,
+    b'\x00\x01\x80\x00\x03\xc0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|\x00\x7f\xfe\x00\xff\xff\x00\xff\xff'
+    b'\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\x01\x80\x00\x00\x00\x00\x00\x00'
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x01\x80\x00\x03\xc0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|'
+    b'\x00\x7f\xfe\x00\xff\xff\x00\xff\xff\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0'
+    b'\x00\t\x90\x00\x1c8\x00>|\x00\x7f\xfe\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0'
+    b'\x00\x03\xc0\x00\x01\x80\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x01\x80\x00\x03\xc0'
+    b'\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|\x00\x7f\xfe\x00\xff\xff\x00\xff\xff\x00\x7f\xfe\x00?\xfc'
+    b'\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|\x00\x7f\xfe\x00\x7f\xfe'
+    b'\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\x01\x80\x00\x04 \x00\x0ep\x00\x1f\xf8'
+    b'\x00?\xfc\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\x01\x80\x00\x00\x00\x00\x00\x00'),
+})
+ACTIONS_2 = Udchars.compiled('  **', {
+  'b': (9,
+    b'\x00\x01\x80\x00\x03\xc0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|\x00\x7f\xfe\x00\xff\xff\x00\xff\xff'
+    b'\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|'
+    b'\x00\x7f\xfe\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\x01\x80\x00\x00\x00'
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+})
+ACTIONS_3 = Udchars.compiled(' ***', {
+  'b': (9,
+    b'\x00\x01\x80\x00\x03\xc0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|\x00\x7f\xfe\x00\xff\xff\x00\xff\xff'
+    b'\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\t\x90\x00\x1c8\x00>|'
+    b'\x00\x7f\xfe\x00\x7f\xfe\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\x01\x80\x00\x04 '
+    b'\x00\x0ep\x00\x1f\xf8\x00?\xfc\x00?\xfc\x00\x1f\xf8\x00\x0f\xf0\x00\x07\xe0\x00\x03\xc0\x00\x01\x80'),
+})
+ACTIONS_FREE = Udchars.compiled('free', {
+  'b': (9,
+    b'\x00\x01\x80\x00\x03\xc0\x00\x06`\x00\x0c0\x00\x1c8\x00>|\x00g\xe6\x00\xc3\xc3\x00\xc1\x83'
+    b'\x00`\x06\x000\x0c\x00\x18\x18\x00\x0c0\x00\x06`\x00\x03\xc0\x00\x01\x80\x00\x00\x00\x00\x00\x00'
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+})
+ACTIONS_REACTION_BIG = Udchars.compiled('  <-', {
+  'b': (9,
+    b'\x02\x00\x00\x04\x00\x00\x0c\x00\x00\x18\x00\x008\x00\x008\x00\x10p\x008p\x008p\x00|'
+    b'\xe0\x00|\xe0\x00\xfe\xe0\x00\xfe\xe0\x01\xff\xf0\x01\xff\xf0\x01\xff\xf0\x01\xbb\xf0\x019\xf8\x008'
+    b'\xf8\x008\xfc\x00x~\x00p\x7f\x00\xf0\x7f\xc3\xe0?\xff\xe0?\xff\xc0\x1f\xff\xc0\x0f\xff\x80'
+    b'\x07\xff\x00\x03\xfe\x00\x00\xf8\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+})
+ACTIONS_REACTION = Udchars.compiled('  <-', {
+  'b': (9,
+    b'\x00\x04\x00\x00\x08\x00\x00\x18\x00\x000\x00\x00p\x00\x00`\x08\x00\xe0\x1c\x00\xc0\x1c\x00\xc0>'
+    b'\x01\xc0>\x01\x80\x7f\x01\x80\x7f\x01\x80\x7f\x01\x80\x7f\x01\xc0]\x01\xc0\x1c\x01\xc0\x1c\x01\xe0\x1c'
+    b'\x01\xe0\x1c\x00\xf08\x00\xf88\x00\xfcx\x00\x7f\xf0\x00\x7f\xf0\x00?\xe0\x00\x1f\xe0\x00\x07\x80'
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+})
@@ -0,0 +1,385 @@
+import re
+
+# reads back the ESC/POS programs printer.py makes and shows them the way the
+# printer would: in the terminal, or as a png at the printer's resolution with
+# user defined characters drawn from their bitmaps.  Only the commands we send
+# are understood.
+
+ESC = 0x1b
+GS = 0x1d
+CONTROL = re.compile(rb"[\x00-\x1f]")
+
+# cell heights in dots, the widths come from the profile.
+FONT_HEIGHTS = {'a': 24, 'b': 17}
+# ESC 2, 1/6 inch at 180 dpi.
+LINE_SPACING = 30
+TAB = 8
+MONOSPACE = ["DejaVuSansMono.ttf", "LiberationMono-Regular.ttf", "NotoSansMono-Regular.ttf"]
+
+# commands that only take one parameter byte and change nothing we show.
+IGNORED = {
+  ESC: b"{=rGJ3V",
+  GS: b"b|Hfhw",
+}
+
+
+class Line:
+  def __init__(self, align: str):
+    self.align = align
+    # (char, glyph, font, bold, underline, invert), glyph is (rows, pcols,
+    # column bytes) for user defined characters.
+    self.cells = []
+
+
+class Image:
+  def __init__(self, width: int, height: int, data: bytes, align: str):
+    self.width = width
+    self.height = height
+    self.data = data
+    self.align = align
+
+
+class Qr:
+  def __init__(self, data: str, size: int, align: str):
+    self.data = data
+    self.size = size
+    self.align = align
+
+
+class Feed:
+  def __init__(self, lines: int):
+    self.lines = lines
+
+
+class Cut:
+  pass
+
+
+class Interpreter:
+  def __init__(self, codepages):
+    # slot -> 128 characters for bytes 0x80 and up.
+    self.codepages = codepages
+    self.blocks = []
+    self.reset()
+
+  def reset(self):
+    self.font = 'a'
+    self.bold = False
+    self.underline = False
+    self.invert = False
+    self.align = 'left'
+    self.codepage = 0
+    self.udc = False
+    # user defined characters are kept per font, (font, code) -> glyph.
+    self.glyphs = {}
+    self.qr = {'size': 3, 'data': b""}
+    self.line = None
+
+  def cell(self, char, glyph=None):
+    if self.line is None:
+      self.line = Line(self.align)
+    self.line.cells.append((char, glyph, self.font, self.bold, self.underline, self.invert))
+
+  def end_line(self):
+    self.blocks.append(self.line or Line(self.align))
+    self.line = None
+
+  def text(self, data: bytes):
+    chars = self.codepages.get(self.codepage) or self.codepages[0]
+    for b in data:
+      glyph = self.glyphs.get((self.font, b)) if self.udc else None
+      if glyph:
+        self.cell(" ", glyph)
+      elif b < 0x80:
+        self.cell(chr(b))
+      else:
+        self.cell(chars[b - 0x80])
+
+  def run(self, program: bytes):
+    i = 0
+    n = len(program)
+    while i < n:
+      m = CONTROL.search(program, i)
+      end = m.start() if m else n
+      if end > i:
+        self.text(program[i:end])
+        i = end
+        continue
+      b = program[i]
+      if b == 0x0a:
+        self.end_line()
+        i += 1
+      elif b == 0x09:
+        used = len(self.line.cells) if self.line else 0
+        for _ in range(TAB - used % TAB):
+          self.cell(" ")
+        i += 1
+      elif b == 0x0d:
+        i += 1
+      elif b == ESC:
+        i = self.esc(program, i + 1)
+      elif b == GS:
+        i = self.gs(program, i + 1)
+      else:
+        raise ValueError(f"unknown control byte {b:#x} at {i}")
+    if self.line:
+      self.end_line()
+    return self.blocks
+
+  def esc(self, p: bytes, i: int) -> int:
+    c = p[i]
+    if c == ord('@'):
+      self.reset()
+      return i + 1
+    if c == ord('2'):
+      return i + 1
+    if c == ord('&'):
+      return self.define_glyphs(p, i + 1)
+    if c == ord('D'):
+      return p.index(b"\x00", i + 1) + 1
+    n = p[i + 1]
+    if c == ord('!'):
+      self.font = 'b' if n & 1 else 'a'
+      self.bold = bool(n & 0x08)
+      self.underline = bool(n & 0x80)
+    elif c == ord('E'):
+      self.bold = bool(n & 1)
+    elif c == ord('-'):
+      self.underline = n in (1, 2, ord('1'), ord('2'))
+    elif c == ord('M'):
+      self.font = 'b' if n in (1, ord('1')) else 'a'
+    elif c == ord('a'):
+      self.align = ['left', 'center', 'right'][n % 48 if n >= 48 else n]
+    elif c == ord('t'):
+      self.codepage = n
+    elif c == ord('%'):
+      self.udc = bool(n & 1)
+    elif c == ord('?'):
+      self.glyphs.pop((self.font, n), None)
+    elif c == ord('d'):
+      if self.line:
+        self.end_line()
+        n -= 1
+      if n > 0:
+        self.blocks.append(Feed(n))
+    elif c not in IGNORED[ESC]:
+      raise ValueError(f"unknown command ESC {chr(c)!r} at {i - 1}")
+    return i + 2
+
+  def define_glyphs(self, p: bytes, i: int) -> int:
+    # ESC & y c1 c2, then for each code: x and x * y column bytes.
+    rows, first, last = p[i], p[i + 1], p[i + 2]
+    i += 3
+    for code in range(first, last + 1):
+      pcols = p[i]
+      size = pcols * rows
+      self.glyphs[(self.font, code)] = (rows, pcols, p[i + 1:i + 1 + size])
+      i += 1 + size
+    return i
+
+  def gs(self, p: bytes, i: int) -> int:
+    c = p[i]
+    if c == ord('V'):
+      m = p[i + 1]
+      if self.line:
+        self.end_line()
+      self.blocks.append(Cut())
+      return i + (3 if m in (65, 66, 97, 98) else 2)
+    if c == ord('v'):
+      # GS v 0 m xL xH yL yH, then the rows.
+      width = p[i + 3] | p[i + 4] << 8
+      height = p[i + 5] | p[i + 6] << 8
+      data = p[i + 7:i + 7 + width * height]
+      if self.line:
+        self.end_line()
+      last = self.blocks[-1] if self.blocks else None
+      if isinstance(last, Image) and last.width == width * 8 and last.align == self.align:
+        # the next band of the same image.
+        last.data += data
+        last.height += height
+      else:
+        self.blocks.append(Image(width * 8, height, data, self.align))
+      return i + 7 + width * height
+    if c == ord('(') and p[i + 1] == ord('k'):
+      return self.qr_function(p, i + 2)
+    if c == ord('!'):
+      return i + 2
+    if c == ord('B'):
+      self.invert = bool(p[i + 1] & 1)
+      return i + 2
+    if c in IGNORED[GS]:
+      return i + 2
+    raise ValueError(f"unknown command GS {chr(c)!r} at {i - 1}")
+
+  def qr_function(self, p: bytes, i: int) -> int:
+    # GS ( k pL pH cn fn parameters, pL + pH * 256 bytes from cn on.
+    size = p[i] | p[i + 1] << 8
+    args = p[i + 2:i + 2 + size]
+    fn = args[1] if len(args) > 1 else None
+    if fn == ord('C'):
+      self.qr['size'] = args[2]
+    elif fn == ord('P'):
+      self.qr['data'] = args[3:]
+    elif fn == ord('Q'):
+      if self.line:
+        self.end_line()
+      self.blocks.append(Qr(self.qr['data'].decode('utf-8', 'replace'), self.qr['size'], self.align))
+    return i + 2 + size
+
+
+def codepages(profile):
+  # ESC t slot -> the characters escpos puts at 0x80 and up.
+  from escpos.magicencode import Encoder
+  pages = profile.get_code_pages()
+  encoder = Encoder(pages)
+  ret = {}
+  for name, slot in pages.items():
+    try:
+      ret[int(slot)] = encoder._get_codepage_char_list(name)
+    except LookupError:
+      pass
+  return ret
+
+def interpret(program: bytes, profile):
+  return Interpreter(codepages(profile)).run(program)
+
+
+def glyph_dot(glyph, x: int, y: int) -> bool:
+  rows, _, data = glyph
+  return bool(data[x * rows + y // 8] & (0x80 >> (y % 8)))
+
+def braille(glyph) -> str:
+  # a glyph in one terminal cell: each of the 2 x 4 dots of a braille
+  # character is set if any dot of its part of the glyph is.
+  rows, pcols, _ = glyph
+  height = rows * 8
+  bits = [0x01, 0x02, 0x04, 0x40, 0x08, 0x10, 0x20, 0x80]
+  code = 0
+  for bx in range(2):
+    for by in range(4):
+      xs = range(bx * pcols // 2, (bx + 1) * pcols // 2)
+      ys = range(by * height // 4, (by + 1) * height // 4)
+      if any(glyph_dot(glyph, x, y) for x in xs for y in ys):
+        code |= bits[bx * 4 + by]
+  return chr(0x2800 + code)
+
+def padding(align: str, used: int, room: int) -> int:
+  if align == 'center':
+    return max(0, (room - used) // 2)
+  if align == 'right':
+    return max(0, room - used)
+  return 0
+
+def to_text(blocks, dots: int, cell_widths) -> str:
+  # one terminal column per character, aligned as on paper with the narrowest
+  # font's width as the unit.
+  unit = min(cell_widths.values())
+  columns = dots // unit
+  out = []
+  for b in blocks:
+    if isinstance(b, Line):
+      used = sum(cell_widths[c[2]] if not c[1] else c[1][1] for c in b.cells)
+      line = [" " * (padding(b.align, used, dots) // unit)]
+      style = ""
+      for char, glyph, _, bold, underline, invert in b.cells:
+        codes = ";".join(c for c, on in [("1", bold), ("4", underline), ("7", invert)] if on)
+        if codes != style:
+          line.append("\x1b[0m" if style else "")
+          line.append(f"\x1b[{codes}m" if codes else "")
+          style = codes
+        line.append(braille(glyph) if glyph else char)
+      if style:
+        line.append("\x1b[0m")
+      out.append("".join(line).rstrip() + "\n")
+    elif isinstance(b, Image):
+      label = f"[image {b.width}x{b.height}]"
+      out.append(" " * (padding(b.align, len(label) * unit, dots) // unit) + label + "\n")
+    elif isinstance(b, Qr):
+      label = f"[qr {b.data}]"
+      out.append(" " * (padding(b.align, len(label) * unit, dots) // unit) + label + "\n")
+    elif isinstance(b, Feed):
+      out.append("\n" * b.lines)
+    elif isinstance(b, Cut):
+      out.append("- " * (columns // 2) + "\n")
+  return "".join(out)
+
+
+def to_png(blocks, dots: int, cell_widths):
+  # the paper as a 1 bit image, dots for pixels.
+  from PIL import Image as PImage
+  from PIL import ImageDraw
+  from PIL import ImageFont
+
+  fonts = {f: load_font(h - 2) for f, h in FONT_HEIGHTS.items()}
+  heights = []
+  for b in blocks:
+    if isinstance(b, Line):
+      heights.append(max([LINE_SPACING] + [c[1][0] * 8 + 6 for c in b.cells if c[1]]))
+    elif isinstance(b, Image):
+      heights.append(b.height)
+    elif isinstance(b, Qr):
+      heights.append(qr_image(b).height)
+    elif isinstance(b, Feed):
+      heights.append(b.lines * LINE_SPACING)
+    elif isinstance(b, Cut):
+      heights.append(LINE_SPACING)
+
+  img = PImage.new('1', (dots, max(1, sum(heights))), 1)
+  draw = ImageDraw.Draw(img)
+  y = 0
+  for b, height in zip(blocks, heights):
+    if isinstance(b, Line):
+      draw_line(draw, img, b, y, height, dots, cell_widths, fonts)
+    elif isinstance(b, Image):
+      raster = PImage.frombytes('1', (b.width, b.height), b.data)
+      raster = raster.point(lambda v: 0 if v else 255, '1')
+      img.paste(raster, (padding(b.align, b.width, dots), y))
+    elif isinstance(b, Qr):
+      qr = qr_image(b)
+      img.paste(qr, (padding(b.align, qr.width, dots), y))
+    elif isinstance(b, Cut):
+      for x in range(0, dots, 12):
+        draw.line([(x, y + height // 2), (x + 5, y + height // 2)], fill=0)
+    y += height
+  return img
+
+def load_font(size: int):
+  # a monospace font with box drawing characters where there is one, Pillow
+  # looks in the system font directories.
+  from PIL import ImageFont
+  for name in MONOSPACE:
+    try:
+      return ImageFont.truetype(name, size)
+    except OSError:
+      pass
+  return ImageFont.load_default(size=size)
+
+def draw_line(draw, img, line: Line, y: int, height: int, dots: int, cell_widths, fonts):
+  used = sum(cell_widths[c[2]] if not c[1] else c[1][1] for c in line.cells)
+  x = padding(line.align, used, dots)
+  for char, glyph, font, bold, underline, invert in line.cells:
+    width = glyph[1] if glyph else cell_widths[font]
+    top = y + height - (glyph[0] * 8 if glyph else FONT_HEIGHTS[font]) - 3
+    ink = 0
+    if invert:
+      draw.rectangle([x, top, x + width - 1, top + FONT_HEIGHTS[font] - 1], fill=0)
+      ink = 1
+    if glyph:
+      for gx in range(glyph[1]):
+        for gy in range(glyph[0] * 8):
+          if glyph_dot(glyph, gx, gy):
+            img.putpixel((x + gx, top + gy), ink)
+    elif char != " ":
+      draw.text((x, top), char, font=fonts[font], fill=ink)
+      if bold:
+        draw.text((x + 1, top), char, font=fonts[font], fill=ink)
+    if underline:
+      bottom = top + FONT_HEIGHTS[font]
+      draw.line([(x, bottom), (x + width - 1, bottom)], fill=ink)
+    x += width
+
+def qr_image(qr: Qr):
+  import qrcode
+  code = qrcode.QRCode(box_size=qr.size, border=0)
+  code.add_data(qr.data)
+  return code.make_image().get_image().convert('1')
@@ -1,30 +1,27 @@
 from contextlib import AbstractContextManager
 from types import TracebackType
 from typing import List
-import io
+import json
+import math
 
-from escpos import printer
-from markdownify import markdownify
-from rich.align import Align
 from rich.console import Console
-from rich.console import ConsoleOptions
 from rich.console import NewLine
-from rich.console import RenderResult
-from rich.markdown import ListElement
-from rich.markdown import ListItem
-from rich.markdown import Markdown
-from rich.markdown import Paragraph
-from rich.markdown import TableElement
 from rich.rule import Rule
 from rich.segment import Segment
 from rich.segment import Segments
 from rich.style import Style
-from rich.text import Text
-from stransi.attribute import Attribute
-import rich.box
-import stransi
 
+# escpos, markdownify, rich.markdown and stransi are imported where they are
+# used: escpos alone loads its capability database on import, which was most
+# of the startup time of a short print-txt.
+import cache
+import htmlrender
+import lru
+import raster
+import stages
+import textstream
 from args import ARGS
+import udchar
 from udchar import Udchars
 
 ARGS.add_argument("--width", dest='text_width', type=int)
@@ -32,6 +29,16 @@ ARGS.add_argument("--details", dest='show_details', action="store_true")
 ARGS.add_argument("--preview", dest='print_preview', action="store_true")
 ARGS.add_argument("--profile", dest='print_profile', default="TM-T88II")
 ARGS.add_argument("--printer", dest='print_addr')
+ARGS.add_argument("--preview-format", dest='preview_format', choices=['bytes', 'text', 'png'],
+                  default='bytes', help="with --preview: the ESC/POS bytes, or as printed in the terminal or a png")
+ARGS.add_argument("--preview-out", dest='preview_out', default='preview.png',
+                  help="where --preview-format png goes")
+ARGS.add_argument("--renderer", choices=['rich', 'html'], default='rich',
+                  help="html lays descriptions out directly, without markdown and rich")
+ARGS.add_argument("--layout-cache", dest='layout_cache', type=int, default=8,
+                  help="layout cache size in M characters, 0 to turn it off")
+ARGS.add_argument("--stream", dest='print_stream', action="store_true",
+                  help="start printing while the rest is still laid out")
 ARGS.add_argument("--font", dest='print_font', choices=['a', 'b'], default='b')
 
 
@@ -41,47 +48,115 @@ TITLE_FONT = 'a'
 TITLE_MARKER = "␁"
 NORMAL_MARKER = "␂"
 
-ASCII_SIMPLE_BOX = rich.box.Box(
-    "    \n"
-    "    \n"
-    " -- \n"
-    "    \n"
-    "    \n"
-    " -- \n"
-    "    \n"
-    "    \n",
-    ascii=True,
-)
-
-class MyTableElement(TableElement):
-  def __init__(self, *args, **kwargs):
-    super().__init__(*args, **kwargs)
-  def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
-    for table in super().__rich_console__(console, options):
-      #table.box = ASCII_SIMPLE_BOX
-      table.box = rich.box.SIMPLE
-      yield table
+# laid out bytes held back when streaming, so the printer isn't sent every line
+# on its own.
+STREAM_BUFFER = 1024
+# most of a job kept to send again to another printer when the one it goes to
+# fails, longer jobs (--stream, print-txt) stop failing over past it.
+REPLAY_LIMIT = 1024 * 1024
+
+
+def profile_columns(profile: str, font: str) -> int:
+  return profile_value(f"{profile}/{font}", profile, lambda p: p.get_columns(font))
+
+def profile_dots(profile: str) -> int:
+  # printable width in dots, for images.  Some profiles don't know it, a line
+  # of font a is at least that wide.
+  def dots(p):
+    pixels = p.profile_data.get('media', {}).get('width', {}).get('pixels')
+    return pixels if isinstance(pixels, int) else p.get_columns('a') * udchar.FONT_COLUMNS['a']
+  return profile_value(f"{profile}/width-dots", profile, dots)
+
+def profile_value(key: str, profile: str, fn):
+  # cached so that escpos doesn't have to be imported just to get the width.
+  path = ARGS.cache_dir / 'profile-columns.json'
+  try:
+    table = json.loads(path.read_text())
+  except (FileNotFoundError, ValueError):
+    table = {}
+  if key not in table:
+    cache.escpos_capabilities()
+    from escpos import printer
+    table[key] = fn(printer.Dummy(profile=profile).profile)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(table))
+  return table[key]
+
+
+class Cut:
+  pass
+
+
+class Markdown:
+  # laid out by rich at render time, so repeats can come from the layout cache.
+  def __init__(self, markup: str):
+    self.markup = markup
+
+
+LAYOUTS = None
+
+def layouts() -> lru.LRU:
+  # wrapped text by (kind, text, widths), shared by every Printer of a run:
+  # the same abilities and descriptions turn up on hundreds of cards.
+  global LAYOUTS
+  if LAYOUTS is None:
+    LAYOUTS = lru.LRU(ARGS.layout_cache * 1024 * 1024)
+  return LAYOUTS
+
+def cached_layout(key, fn):
+  # key ends in the text, entries are sized by it.
+  ret = layouts().get(key)
+  if ret is None:
+    stages.count('layout misses')
+    ret = layouts().put(key, fn(), size=2 * len(key[1]) + 100)
+  else:
+    stages.count('layout hits')
+  return ret
+
+
+class Lines:
+  # wrapped plain text, printed as it is.
+  def __init__(self, lines: List[str]):
+    self.lines = lines
+
+
+class Raw:
+  # ESC/POS compiled elsewhere, starts and ends in the default style.
+  def __init__(self, program: bytes):
+    self.program = program
 
 
 class Printer(AbstractContextManager):
 
-  def __init__(self):
-    Paragraph.new_line = False
-    ListElement.new_line = False
-    ListItem.new_line = False
+  def __init__(self, device=None):
+    self.device = device
+    self.format_to_print = ARGS.print_preview or ARGS.print_addr or device
+    # --printer may be several, the job is laid out for the one it goes to.
+    # A fresh pool per script always starts with the first, only print-daemon
+    # spreads jobs over them.
+    self.pool = None
+    self.own_device = None
+    self.sent = []
+    self.sent_bytes = 0
+    if not device and ARGS.print_addr and not ARGS.print_preview:
+      from device import Pool
+      self.pool = Pool(ARGS.print_addr, ARGS.print_profile)
+      self.own_device = self.pool.acquire()
+    self.profile = getattr(device or self.own_device, 'profile', None) or ARGS.print_profile
 
     if ARGS.text_width:
       self.width = ARGS.text_width
     else:
-      p = printer.Dummy(profile=ARGS.print_profile)
-      self.width = p.profile.get_columns(ARGS.print_font)
+      self.width = profile_columns(self.profile, ARGS.print_font)
     if self.width < 10:
       raise Exception(f"invalid width: {self.width}")
 
-    self.title_width = min(self.width, p.profile.get_columns(TITLE_FONT))
-    self.format_to_print = ARGS.print_preview or ARGS.print_addr
+    self.title_width = min(self.width, profile_columns(self.profile, TITLE_FONT))
 
     self.renderables = []
+    self.section = False
+    self.compiler = None
+    self.preview = []
 
     self.console = Console(
         force_terminal=True,
@@ -96,14 +171,27 @@ class Printer(AbstractContextManager):
 
   def __exit__(self, exc_type: type[BaseException] | None, exc_value:
                BaseException | None, traceback: TracebackType | None) -> None:
-    self.render()
+    try:
+      if exc_type is None:
+        self.render()
+    finally:
+      self.close()
+
+  def close(self):
+    if self.pool:
+      self.pool.release(self.own_device)
+      self.pool.close()
+      self.pool = None
 
   @staticmethod
   def html_to_md(html):
     if not html or html == '<p></p>':
       return None
-    html = html.replace('\n', '')
-    return markdownify(html, strip=['hr'])
+    @stages.timed('markdownify')
+    def convert():
+      from markdownify import markdownify
+      return markdownify(html.replace('\n', ''), strip=['hr'])
+    return cached_layout(('markdownify', html), convert)
 
   def println(self):
     self.print("")
@@ -113,12 +201,28 @@ class Printer(AbstractContextManager):
       return
 
     if isinstance(text, str):
-      self.renderables.append(Segments([Segment(text), Segment.line()]))
+      self.add(Segments([Segment(text), Segment.line()]))
     elif isinstance(text, Segments):
-      self.renderables.append(text)
+      self.add(text)
     else:
       raise Exception(f"can not print type {type(text)}: {text}")
 
+  def print_file(self, f):
+    # text of any length, wrapped to the width and sent a chunk at a time
+    # instead of laid out as a whole first.
+    lines = []
+    size = 0
+    for line in textstream.wrap(f, self.width):
+      lines.append(line)
+      size += len(line) + 1
+      if size >= STREAM_BUFFER:
+        self.add(Lines(lines))
+        self.flush()
+        lines = []
+        size = 0
+    if lines:
+      self.add(Lines(lines))
+
   def print_title(self, text: str | List[str | Udchars]):
     page_width = self.title_width if self.format_to_print else self.width
     text_width = self.count_chars(text)
@@ -128,22 +232,36 @@ class Printer(AbstractContextManager):
     if self.format_to_print:
       segs.insert(0, Segment(TITLE_MARKER))
       segs.append(Segment(NORMAL_MARKER, style=Style(bold=True)))
-    self.renderables.append(Segments(segs))
+    self.add(Segments(segs))
 
   def print_html(self, html):
+    r = self.description(html)
+    if r:
+      self.add(r)
+
+  def description(self, html):
+    # what html is printed as, None if there is nothing in it.
+    if ARGS.renderer == 'html':
+      return htmlrender.Html(html) if htmlrender.has_text(html) else None
     md = self.html_to_md(html)
-    if not md:
-      return
-    self.print_markdown(md)
+    return Markdown(md) if md else None
 
   def print_markdown(self, markup):
-    md = Markdown(markup)
-    md.elements["table_open"] = MyTableElement
-    self.renderables.append(md)
+    self.add(Markdown(markup))
 
   def print_hr(self):
     # ─ should get converted to cp437/0xc4
-    self.renderables.append(Rule(characters='─'))
+    self.add(Rule(characters='─'))
+
+  def print_image(self, source: bytes, name: str = "", dither: str = 'fs', dots: int = None):
+    # dots wide, the whole printable width by default.
+    self.add(raster.Image(source, name, dither, dots))
+
+  def print_qr(self, data: str, size: int = 6):
+    self.add(raster.Qr(data, size))
+
+  def print_cut(self):
+    self.add(Cut())
 
   def print_item(self, marker: str | List[str | Udchars], text):
     if not text:
@@ -152,29 +270,37 @@ class Printer(AbstractContextManager):
 
   def render_item(self, marker: str | List[str | Udchars], text):
     marker_width = self.count_chars(marker)
-    opts = self.console.options.update_width(self.width - marker_width)
-    lines = self.console.render_lines(text, options=opts, pad=False)
+    lines = self.wrap_lines(text, self.width - marker_width)
     ret = []
 
     ret.extend(self.segment_wrap(marker))
-    ret.extend(lines.pop(0))
+    ret.extend(lines[0])
     ret.append(NewLine())
 
-    for l in lines:
+    for l in lines[1:]:
       ret.append(Segment(' ' * marker_width))
       ret.extend(l)
       ret.append(NewLine())
 
     return Segments(ret)
 
+  def wrap_lines(self, text, width: int):
+    def wrap():
+      opts = self.console.options.update_width(width)
+      with stages.stage('rich'):
+        return tuple(tuple(l) for l in self.console.render_lines(text, options=opts, pad=False))
+    if not isinstance(text, str):
+      return wrap()
+    return cached_layout(('item', text, width), wrap)
+
   def print_heading_and_html(self, things):
     for heading, html in things:
-      md = self.html_to_md(html)
-      if not md:
+      r = self.description(html)
+      if not r:
         continue
       self.print_hr()
       self.print(heading)
-      self.print_markdown(md)
+      self.add(r)
 
   def count_chars(self, thing: str | List[str | Udchars]):
     if isinstance(thing, list):
@@ -187,26 +313,172 @@ class Printer(AbstractContextManager):
     return [Segment(things) if isinstance(things, str) else things]
 
   def render(self):
-    p = None
-    if ARGS.print_preview:
-      p = printer.Dummy(profile=ARGS.print_profile)
-    elif ARGS.print_addr:
-      p = printer.Network(ARGS.print_addr, profile=ARGS.print_profile)
+    # the rest of the job and the cut go in one write.
+    self.flush(math.inf)
+    if not self.format_to_print:
+      return
+
+    p = self.job()
+    p.cut()
+    self.send(p)
+    if self.preview:
+      self.show_preview(b"".join(self.preview))
+
+  def show_preview(self, program: bytes):
+    if ARGS.preview_format == 'bytes':
+      print(program, end="")
+      return
+    import preview
+    with stages.stage('preview'):
+      p = self.job()
+      blocks = preview.interpret(program, p.profile)
+      dots = profile_dots(self.profile)
+      cells = {f: udchar.cell_width(p.profile, f) for f, n in [('a', '0'), ('b', '1')]
+               if n in p.profile.fonts}
+      if ARGS.preview_format == 'text':
+        print(preview.to_text(blocks, dots, cells), end="")
+      else:
+        preview.to_png(blocks, dots, cells).save(ARGS.preview_out)
 
-    if p:
-      p.set_with_default(font=ARGS.print_font)
+  def add(self, renderable):
+    self.renderables.append(renderable)
+    if ARGS.print_stream and not self.section:
+      self.flush(STREAM_BUFFER)
 
-    self.render_renderables(self.renderables, p)
+  def flush(self, keep=0):
+    # lays out everything printed so far and sends it once more than keep
+    # bytes are waiting, the cut comes at the end.
+    renderables = self.renderables
+    self.renderables = []
+    if not self.format_to_print:
+      self.render_renderables(renderables, None)
+      return
+    p = self.job()
+    self.render_renderables(renderables, p)
+    if p.size > keep:
+      self.send(p)
+
+  def job(self):
+    # one compiler for the whole job, the printer state it tracks (style,
+    # user defined characters) carries over between flushes.
+    if not self.compiler:
+      from compiler import Compiler
+      self.compiler = Compiler(profile=self.profile)
+      self.compiler.set_with_default(font=ARGS.print_font)
+    return self.compiler
+
+  def send(self, p):
+    program = p.output
+    p.clear()
+    if not program:
+      return
+    stages.count('bytes', len(program))
+    stages.count('writes')
+    with stages.stage('write'):
+      if self.device:
+        self.device.write(program)
+      elif ARGS.print_preview:
+        self.preview.append(program)
+      else:
+        self.write_own(program)
+
+  def write_own(self, program: bytes):
+    # a printer failing halfway may have printed part of the job, the next one
+    # gets all of it.
+    from device import ERRORS
+    try:
+      self.own_device.write(program, retries=0)
+    except ERRORS:
+      if len(self.pool.devices) == 1 or self.sent is None:
+        raise
+      self.own_device = self.pool.failover(self.own_device, b"".join(self.sent) + program, retries=0)
+    if len(self.pool.devices) > 1 and self.sent is not None:
+      self.sent.append(program)
+      self.sent_bytes += len(program)
+      if self.sent_bytes > REPLAY_LIMIT:
+        self.sent = None
 
-    if ARGS.print_preview:
-      print(p.output, end="")
-    elif ARGS.print_addr:
-      p.cut()
+  @staticmethod
+  def default_style():
+    return {'font': ARGS.print_font, 'bold': False, 'underline': False}
+
+  def compile_section(self, fn) -> bytes:
+    # everything fn prints, as a Raw-able program.
+    job = self.renderables
+    self.renderables = []
+    section = self.section
+    self.section = True
+    try:
+      fn()
+      from compiler import Compiler
+      p = Compiler(profile=self.profile, state=self.default_style())
+      self.render_renderables(self.renderables, p)
+      p.set(**self.default_style())
+      p.flush()
+      return p.output
+    finally:
+      self.renderables = job
+      self.section = section
+
+  def record_section(self, fn) -> bytes:
+    # what compile_section would return, but streamed into the job as fn
+    # prints.  The job is brought into the state a Raw starts in first.
+    self.flush(STREAM_BUFFER)
+    p = self.job()
+    p.set(**self.default_style())
+    p.flush()
+    p.state = self.default_style()
+    p.magic.encoding = None
+    udchar.registers(p).clear()
+    p.recording = []
+    try:
+      fn()
+      self.flush(STREAM_BUFFER)
+      p.set(**self.default_style())
+      p.flush()
+      return b"".join(p.recording)
+    finally:
+      p.recording = None
+
+  def print_cached(self, source: bytes, opts, fn):
+    # fn prints a card made only from source and opts.
+    if not self.format_to_print or ARGS.no_cache:
+      fn()
+      return
+
+    cards = cache.cards()
+    key = cards.key(source, *opts, self.width, ARGS.print_font, self.profile, ARGS.renderer)
+    program = cards.get(key)
+    if program is not None:
+      self.print_raw(program)
+    elif ARGS.print_stream and not self.section:
+      cards.put(key, self.record_section(fn))
+    else:
+      program = self.compile_section(fn)
+      cards.put(key, program)
+      self.print_raw(program)
+
+  def print_raw(self, program: bytes):
+    self.add(Raw(program))
 
   def render_renderables(self, renderables, printer):
     for r in renderables:
-      if isinstance(r, Segments):
+      if isinstance(r, Cut):
+        self.render_cut(printer)
+      elif isinstance(r, Raw):
+        self.render_raw(r, printer)
+      elif isinstance(r, Segments):
         self.render_segments(r.segments, printer)
+      elif isinstance(r, htmlrender.Html):
+        self.render_html(r, printer)
+      elif isinstance(r, Markdown):
+        self.render_markdown(r, printer)
+      elif isinstance(r, Lines):
+        self.render_lines(r, printer)
+      elif isinstance(r, raster.Image):
+        self.render_image(r, printer)
+      elif isinstance(r, raster.Qr):
+        self.render_qr(r, printer)
       else:
         self.render_rich([r], printer)
 
@@ -215,50 +487,137 @@ class Printer(AbstractContextManager):
       if isinstance(s, Udchars):
         self.render_udchars(s, printer)
       elif isinstance(s, Segment):
-        self.render_rich([Segments([s])], printer)
+        ansi = cached_layout(('segment', s.text, s.style, self.width),
+                             lambda: self.capture([Segments([s])]))
+        self.print_ansi(ansi, printer)
       else:
         self.render_rich([s], printer)
 
+  def render_cut(self, printer):
+    if printer:
+      printer.cut()
+    else:
+      print()
+
+  def render_raw(self, raw: Raw, printer):
+    if not printer:
+      raise Exception("can not print raw ESC/POS to the console")
+    printer.set(**self.default_style())
+    printer.flush()
+    printer._raw(raw.program)
+    # the program may have switched codepage or redefined user defined
+    # characters behind our back.
+    printer.magic.encoding = None
+    udchar.registers(printer).clear()
+
+  def render_html(self, html: htmlrender.Html, printer):
+    def layout():
+      with stages.stage('html'):
+        return htmlrender.layout(html.html, self.width)
+    lines = cached_layout(('html', html.html, self.width), layout)
+    if printer:
+      htmlrender.render(lines, printer)
+    else:
+      print(htmlrender.render_ansi(lines), end="")
+
+  def render_lines(self, lines: Lines, printer):
+    text = "\n".join(lines.lines) + "\n"
+    if printer:
+      printer.text(text)
+    else:
+      print(text, end="")
+
+  def render_markdown(self, md: Markdown, printer):
+    def layout():
+      import mdrender
+      with stages.stage('markdown'):
+        r = mdrender.markdown(md.markup)
+      return self.capture([r])
+    self.print_ansi(cached_layout(('markdown', md.markup, self.width), layout), printer)
+
+  def render_image(self, image: raster.Image, printer):
+    dots = image.dots or profile_dots(self.profile)
+    if not printer:
+      print(f"[image {image.name}, {dots} dots wide]")
+      return
+    with stages.stage('raster'):
+      img = raster.bitmap(image.source, dots, image.dither)
+      program = raster.raster(img)
+    printer.set(align='center')
+    printer._raw(program)
+    printer.set(align='left')
+
+  def render_qr(self, qr: raster.Qr, printer):
+    if not printer:
+      print(f"[qr {qr.data}]")
+      return
+    # the native command where the profile has it, an image of it otherwise.
+    printer.set(align='center')
+    printer.qr(qr.data, size=qr.size, native=printer.profile.supports('qrCode'))
+    printer.set(align='left')
+
   def render_udchars(self, udchars: Udchars, printer):
     if printer:
-      udchars.print_to_printer(printer, "b")
+      # glyphs are defined per font, in the one the pending set() selects.
+      printer.flush()
+      udchars.print_to_printer(printer, printer.state.get('font', ARGS.print_font))
     else:
       print(udchars.placeholder, end="")
 
   def render_rich(self, renderables: List, printer):
-    with self.console.capture() as cap:
+    self.print_ansi(self.capture(renderables), printer)
+
+  def capture(self, renderables: List) -> str:
+    with stages.stage('rich'), self.console.capture() as cap:
       for r in renderables:
         self.console.print(r)
+    stages.count('captures')
+    return cap.get()
 
+  def print_ansi(self, ansi: str, printer):
     if printer:
-      self.ansi_to_escpos(cap.get(), printer)
+      self.ansi_to_escpos(ansi, printer)
     else:
-      print(cap.get(), end="")
+      print(ansi, end="")
 
   def ansi_to_escpos(self, ansi, printer):
+    for set_args, text in cached_layout(('ansi', ansi, ARGS.print_font), lambda: self.decode_ansi(ansi)):
+      if set_args:
+        printer.set(**set_args)
+      else:
+        printer.text(text)
+
+  @staticmethod
+  @stages.timed('escpos')
+  def decode_ansi(ansi):
+    # (set() arguments, None) and (None, text) in order.
+    import stransi
+    from stransi.attribute import Attribute
+    ops = []
     decoded = stransi.Ansi(ansi)
     for i in decoded.instructions():
       if isinstance(i, str):
         if i.startswith(TITLE_MARKER):
-          printer.set(font=TITLE_FONT)
+          ops.append(({'font': TITLE_FONT}, None))
           i = i[1:]
         elif i.startswith(NORMAL_MARKER):
-          printer.set(font=ARGS.print_font)
+          ops.append(({'font': ARGS.print_font}, None))
           i = i[1:]
 
-        printer.text(i)
+        ops.append((None, i))
 
       elif isinstance(i, stransi.SetAttribute):
         # https://github.com/getcuia/stransi/blob/main/src/stransi/attribute.py
         if i.attribute == Attribute.NORMAL:
-          printer.set(bold=False, underline=False)
+          ops.append(({'bold': False, 'underline': False}, None))
         elif i.attribute == Attribute.BOLD:
-          printer.set(bold=True)
+          ops.append(({'bold': True}, None))
         elif i.attribute == Attribute.UNDERLINE:
-          printer.set(underline=True)
+          ops.append(({'underline': True}, None))
         elif i.attribute == Attribute.ITALIC:
-          printer.set(bold=True)  # map italic to bold.
+          ops.append(({'bold': True}, None))  # map italic to bold.
         else:
           raise Exception(f"unknown attribute {i.attribute}: {i}")
       else:
         raise Exception(f"unknown type {type(i)}: {i}")
+    return ops
@@ -0,0 +1,105 @@
+import hashlib
+import io
+
+import cache
+from args import ARGS
+
+# Pillow is only imported once an image is actually converted.
+
+DITHERS = ['fs', 'ordered', 'threshold']
+
+# rows per GS v 0 command, small enough for the receive buffer of old printers.
+BAND_ROWS = 128
+
+
+class Image:
+  def __init__(self, source: bytes, name: str = "", dither: str = 'fs', dots: int = None):
+    self.source = source
+    self.name = name
+    self.dither = dither
+    self.dots = dots
+
+
+class Qr:
+  def __init__(self, data: str, size: int = 6):
+    self.data = data
+    self.size = size
+
+
+def bayer(n: int):
+  # n x n ordered dither thresholds, n a power of two.
+  m = [[0]]
+  while len(m) < n:
+    m = ([[4 * v for v in row] + [4 * v + 2 for v in row] for row in m] +
+         [[4 * v + 3 for v in row] + [4 * v + 1 for v in row] for row in m])
+  return m
+
+def ordered(gray):
+  # a dot wherever the pixel is darker than the tiled threshold map, both
+  # compared by Pillow in C.
+  from PIL import Image as PImage
+  from PIL import ImageChops
+  n = 8
+  tile = PImage.new('L', (n, n))
+  tile.putdata([int((v + 0.5) * 256 / (n * n)) for row in bayer(n) for v in row])
+  strip = PImage.new('L', (gray.width, n))
+  for x in range(0, gray.width, n):
+    strip.paste(tile, (x, 0))
+  thresholds = PImage.new('L', gray.size)
+  for y in range(0, gray.height, n):
+    thresholds.paste(strip, (0, y))
+  # > 0 where the pixel is lighter than its threshold, i.e. stays white.
+  return ImageChops.subtract(gray, thresholds).point(lambda v: 255 if v else 0, '1')
+
+def dither(gray, method: str):
+  from PIL import Image as PImage
+  if method == 'fs':
+    return gray.convert('1', dither=PImage.Dither.FLOYDSTEINBERG)
+  if method == 'ordered':
+    return ordered(gray)
+  if method == 'threshold':
+    return gray.point(lambda v: 255 if v >= 128 else 0, '1')
+  raise Exception(f"unknown dither: {method}")
+
+def convert(source: bytes, dots: int, method: str):
+  # 1 bit image dots wide, white background under transparency.
+  from PIL import Image as PImage
+  img = PImage.open(io.BytesIO(source))
+  if img.mode in ('RGBA', 'LA', 'P'):
+    img = img.convert('RGBA')
+    background = PImage.new('RGBA', img.size, (255, 255, 255, 255))
+    img = PImage.alpha_composite(background, img)
+  gray = img.convert('L')
+  height = max(1, round(gray.height * dots / gray.width))
+  gray = gray.resize((dots, height), PImage.Resampling.LANCZOS)
+  return dither(gray, method)
+
+def bitmap(source: bytes, dots: int, method: str):
+  # converted images are kept as 1 bit pngs in the cache dir, by content,
+  # width and dither.
+  from PIL import Image as PImage
+  key = hashlib.sha256(source + f"/{dots}/{method}".encode()).hexdigest()
+  path = ARGS.cache_dir / 'raster' / f"{key}.png"
+  try:
+    return PImage.open(path)
+  except FileNotFoundError:
+    pass
+  img = convert(source, dots, method)
+  if not ARGS.no_cache:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    img.save(tmp, format='PNG')
+    tmp.replace(path)
+  return img
+
+def raster(img) -> bytes:
+  # GS v 0 in bands of BAND_ROWS, a set bit is a black dot.
+  from PIL import ImageChops
+  data = ImageChops.invert(img.convert('1')).tobytes()
+  row = (img.width + 7) // 8
+  out = []
+  for y in range(0, img.height, BAND_ROWS):
+    rows = min(BAND_ROWS, img.height - y)
+    out.append(b"\x1dv0\x00" + row.to_bytes(2, 'little') + rows.to_bytes(2, 'little'))
+    out.append(data[y * row:(y + rows) * row])
+  return b"".join(out)
@@ -1,33 +1,105 @@
 import json
 import pathlib
+from collections.abc import Mapping
+from collections.abc import Sequence
 
+import stages
 from args import ARGS
 
+try:
+  import orjson
+  loads = orjson.loads
+except ImportError:
+  loads = json.loads
+
 ARGS.add_argument("--json", dest='json_path',  type=pathlib.Path)
 
 
-class RDict(dict):
-  def __missing__(self, key):
-    return RDict()
+class RDict(Mapping):
+  # view over a parsed json object where missing and null keys read as an
+  # empty RDict.  Nested objects and arrays are wrapped as they are read,
+  # nothing is copied.
+  __slots__ = ('_d',)
+
+  def __init__(self, d=None):
+    self._d = {} if d is None else d
+
+  def __getitem__(self, key):
+    v = self._d.get(key)
+    if v is None:
+      return RDict()
+    return to_rdict(v)
+
+  def __setitem__(self, key, value):
+    self._d[key] = value
+
+  def get(self, key, default=None):
+    v = self._d.get(key)
+    if v is None:
+      return default
+    return to_rdict(v)
+
+  def __contains__(self, key):
+    return self._d.get(key) is not None
+
+  def __iter__(self):
+    return (k for k, v in self._d.items() if v is not None)
+
+  def __len__(self):
+    return sum(1 for v in self._d.values() if v is not None)
+
+  def __bool__(self):
+    return any(v is not None for v in self._d.values())
+
   def __str__(self):
     return ""
   def __repr__(self):
     return ""
 
+
+class RList(Sequence):
+  __slots__ = ('_l',)
+
+  def __init__(self, l):
+    self._l = l
+
+  def __getitem__(self, i):
+    if isinstance(i, slice):
+      return RList(self._l[i])
+    return to_rdict(self._l[i])
+
+  def __iter__(self):
+    return (to_rdict(v) for v in self._l)
+
+  def __len__(self):
+    return len(self._l)
+
 def to_rdict(d):
   if isinstance(d, dict):
-    return RDict({k: to_rdict(v) for k, v in d.items() if v is not None})
+    return RDict(d)
   if isinstance(d, list):
-    return [to_rdict(i) for i in d]
+    return RList(d)
   else:
     return d
 
+@stages.timed('json')
+def parse(source: bytes):
+  return to_rdict(loads(source))
+
+@stages.timed('read')
+def read_source_file(path) -> bytes:
+  with open(path, 'rb') as f:
+    return f.read()
+
+def read_source(name=None, kind_name=None) -> bytes:
+  # --json wins, otherwise look name up in the pack index.
+  if ARGS.json_path or not name:
+    return read_source_file(ARGS.get_required('json_path'))
+  import packindex
+  return read_source_file(packindex.resolve(name, kind_name))
+
 def read_json_file(path):
-  with open(path, 'r') as f:
-    data = json.load(f)
-  return to_rdict(data)
+  return parse(read_source_file(path))
 
 def read_json():
-  with open(ARGS.get_required('json_path'), 'r') as f:
-    data = json.load(f)
-  return to_rdict(data)
+  return parse(read_source())
@@ -0,0 +1,17 @@
+import pf
+from formatting import com
+
+def print_rule(data, printer):
+  # conditions, actions, feats and the like: what they are and their text.
+  stm = data['system']
+
+  printer.print_title(data['name'])
+  printer.print(com(
+    data['type'],
+    stm['level'] and pf.level(stm['level']),
+    stm['traits']['rarity'],
+    *stm['traits']['value'],
+    ))
+
+  printer.print_hr()
+  printer.print_html(pf.remove_macros_html(stm['description']['value']))
@@ -3,6 +3,7 @@ pkgs.mkShell {
   packages = with pkgs; [
     (pkgs.python3.withPackages (python-pkgs: with python-pkgs; [
       markdownify
+      orjson
       python-escpos
       requests
       rich
@@ -0,0 +1,147 @@
+from operator import itemgetter
+
+import dice
+import pf
+from args import ARGS
+from formatting import com
+from formatting import space
+from formatting import suffix
+
+ARGS.add_argument("--rank", type=int)
+ARGS.add_argument("--ranks", help="a card for each rank: all, 3-9 or 3,5,7")
+
+
+def duration(d):
+  if not d['sustained']:
+    return None
+  return d['value']
+
+MAX_RANK = 10
+
+def get_heightening(stm, rank):
+  if not rank:
+    return (None, None)
+  if not stm['heightening']:
+    raise Exception(f"heightening not supported.")
+  if rank <= stm['level']['value']:
+    raise Exception(f"heightening rank is less than spell rank.")
+
+  heightening = stm['heightening']
+  typ = heightening['type']
+  if typ == 'interval':
+    mul = (rank - stm['level']['value']) / heightening['interval']
+    if not mul.is_integer():
+      raise Exception(f"invalid heightening rank: {rank}")
+    mul = int(mul)
+    return (mul, heightening)
+  elif typ == 'fixed':
+    h = heightening['levels'][str(rank)]
+    if not h:
+      raise Exception(f"rank {rank} not defined for heightening, "
+                      f"only: {list(heightening['levels'].keys())}")
+    return (None, h)
+
+  raise Exception(f"unknown heightening type: {typ}")
+
+def ranks(stm):
+  # every rank the spell can be cast at, lowest first.
+  base = stm['level']['value']
+  heightening = stm['heightening']
+  if heightening['type'] == 'interval':
+    return list(range(base, MAX_RANK + 1, heightening['interval']))
+  if heightening['type'] == 'fixed':
+    return [base] + sorted(int(r) for r in heightening['levels'] if int(r) > base)
+  return [base]
+
+def parse_ranks(spec: str, stm):
+  # all, 3-9 (the valid ones in between) or 3,5,7
+  if spec == 'all':
+    return ranks(stm)
+  if '-' in spec:
+    low, high = [int(r) for r in spec.split('-', 1)]
+    return [r for r in ranks(stm) if low <= r <= high]
+  return [int(r) for r in spec.split(',')]
+
+def heighten_damage(stm, heightening):
+  damage = stm['damage']
+  hmul, h = heightening
+  if not h:
+    return [pf.damage(v) for (k, v) in damage.items()]
+  if hmul:
+    return [pf.damage(d, dice.parse(h['damage'][k]).mul(hmul)) for k, d in damage.items()]
+  return [pf.damage(h['damage'][k]) for k, d in damage.items()]
+
+def heighten_target(stm, heightening):
+  _, h = heightening
+  ht = h['target']['value'] if h else None
+  return ht or stm['target']['value']
+
+def heighten_range(stm, heightening):
+  _, h = heightening
+  hr = h['range']['value'] if h else None
+  return hr or stm['range']['value']
+
+def heighten_area(stm, heightening):
+  val = stm['area']['value']
+  typ = stm['area']['type']
+
+  hmul, h = heightening
+  if h and h['area']:
+    if hmul and h['area']:
+      val += hmul * h['area']
+    else:
+      val = h['area']['value']
+      typ = h['area']['type']
+
+  return space(val, typ)
+
+def print_spell(data, printer):
+  stm = data['system']
+  if not ARGS.ranks:
+    print_heading(data, printer, ARGS.rank, get_heightening(stm, ARGS.rank))
+    print_description(stm, printer)
+    return
+
+  # one card per rank, the description is the same on all of them.
+  if printer.format_to_print:
+    program = printer.compile_section(lambda: print_description(stm, printer))
+    description = lambda: printer.print_raw(program)
+  else:
+    description = lambda: print_description(stm, printer)
+
+  base = stm['level']['value']
+  for num, rank in enumerate(parse_ranks(ARGS.ranks, stm)):
+    if num > 0:
+      printer.print_cut()
+    print_heading(data, printer, rank, get_heightening(stm, rank if rank != base else None))
+    description()
+
+def print_heading(data, printer, rank, heightening):
+  stm = data['system']
+
+  actions = pf.actions(stm)
+  printer.print_title([data['name'], " ", actions]);
+  # TODO is ritual?
+
+  printer.print(com(
+    f"R{rank}" if rank else pf.level(stm['level'], letter="R"),
+    heighten_target(stm, heightening),
+    heighten_range(stm, heightening),
+    heighten_area(stm, heightening),
+    duration(stm['duration']),
+    ));
+
+  printer.print(com(
+    *heighten_damage(stm, heightening),
+    ));
+
+  printer.print(com(
+    stm['traits']['rarity'],
+    *stm['traits']['traditions'],
+    *stm['traits']['value'],
+    ))
+
+  printer.print_hr()
+
+def print_description(stm, printer):
+  printer.print_html(pf.remove_macros_html(stm['description']['value']))
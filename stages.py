@@ -0,0 +1,112 @@
+import atexit
+import collections
+import contextlib
+import functools
+import json
+import pathlib
+import sys
+import time
+
+from args import ARGS
+
+ARGS.add_argument("--profile-stages", dest='profile_stages', nargs='?', const='table',
+                  choices=['table', 'json'], help="time each render stage, to stderr")
+
+# counters always reported next to the stage times, others once counted.
+COUNTERS = ['bytes', 'writes', 'captures']
+
+
+class Stages:
+  # inclusive wall time and calls per stage, plus counters, for one entry
+  # (a card or the whole run).
+
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    self.times = collections.defaultdict(float)
+    self.calls = collections.defaultdict(int)
+    self.counts = {c: 0 for c in COUNTERS}
+    self.start = time.perf_counter()
+
+  @contextlib.contextmanager
+  def stage(self, name: str):
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.times[name] += time.perf_counter() - start
+      self.calls[name] += 1
+
+  def count(self, name: str, n: int = 1):
+    self.counts[name] = self.counts.get(name, 0) + n
+
+  def used(self):
+    return bool(self.calls) or any(self.counts.values())
+
+  def result(self, label: str):
+    return {
+      'entry': label,
+      'total_ms': round((time.perf_counter() - self.start) * 1000, 3),
+      'stages': {k: {'ms': round(v * 1000, 3), 'calls': self.calls[k]}
+                 for k, v in sorted(self.times.items(), key=lambda i: -i[1])},
+      **self.counts,
+    }
+
+  def report(self, label: str, fmt: str, out=None):
+    out = out or sys.stderr
+    r = self.result(label)
+    if fmt == 'json':
+      print(json.dumps(r), file=out)
+      return
+    counts = ', '.join(f"{n} {c}" for c, n in self.counts.items())
+    print(f"{label}: {r['total_ms']:.1f} ms, {counts}", file=out)
+    for name, s in r['stages'].items():
+      print(f"  {name:16} {s['ms']:9.2f} ms {s['calls']:6}", file=out)
+
+
+STAGES = Stages()
+
+def enabled():
+  return ARGS.profile_stages is not None
+
+def stage(name: str):
+  if not enabled():
+    return contextlib.nullcontext()
+  return STAGES.stage(name)
+
+def timed(name: str):
+  def decorator(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      with stage(name):
+        return fn(*args, **kwargs)
+    return wrapper
+  return decorator
+
+def count(name: str, n: int = 1):
+  if enabled():
+    STAGES.count(name, n)
+
+@contextlib.contextmanager
+def entry(label: str):
+  # everything inside is reported as one entry, e.g. one card of a batch.
+  global STAGES
+  if not enabled():
+    yield
+    return
+  outer = STAGES
+  STAGES = Stages()
+  try:
+    yield
+  finally:
+    STAGES.report(label, ARGS.profile_stages)
+    STAGES = outer
+
+def report_rest():
+  # whatever happened outside of an entry, the whole run for single cards.
+  # Not if the arguments never parsed, --help or an error.
+  if ARGS.args is not None and enabled() and STAGES.used():
+    STAGES.report(pathlib.Path(sys.argv[0]).name, ARGS.profile_stages)
+
+atexit.register(report_rest)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import pathlib
+import re
+import threading
+import time
+
+import cache  # --cache-dir, --no-cache
+import rdata
+from args import ARGS
+from formatting import space
+
+def print_recipe(data, printer):
+  printer.print_title(f"{data['id']}: {data['name']}");
+
+  for num, step in enumerate(data['steps']):
+    printer.println()
+    printer.print(f"Step {num}")
+
+    for ing in step['ingredients']:
+      amt = space(
+          f"{ing['amount']:g}" if ing['amount'] else None,
+          ing['unit']['name'])
+      amt = f"**{amt}**" if amt else None
+
+      note = ing['note']
+      note = f"({note})" if note else None
+
+      printer.print_markdown(space(
+        "*",
+        amt,
+        ing['food']['name'],
+        note,
+        ))
+
+    #printer.print(step['instruction'])
+    printer.print_html(step['instructions_markdown'])
+
+# recipes are fetched over one pooled session, a few at a time.  Responses are
+# kept in the cache dir with their ETag: within ttl they are used as they are,
+# after that the server is asked whether they changed.
+
+TIMEOUT = (5, 30)
+RETRIES = 3
+RECIPE_URL = re.compile(r"^(?P<server>.*?)/(?:view/)?recipe/(?P<id>\d+)/?$")
+
+
+def session(token, jobs: int = 4):
+  import requests
+  from requests.adapters import HTTPAdapter
+  from urllib3.util.retry import Retry
+  s = requests.Session()
+  s.headers["Authorization"] = f"Bearer {token}"
+  retry = Retry(total=RETRIES, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+  adapter = HTTPAdapter(pool_connections=1, pool_maxsize=jobs, max_retries=retry)
+  s.mount("http://", adapter)
+  s.mount("https://", adapter)
+  return s
+
+def recipe_url(recipe: str, server: str | None) -> str:
+  # a recipe id, its page or its api url.
+  if recipe.isdigit():
+    if not server:
+      raise Exception(f"recipe {recipe}: an id needs --server")
+    return f"{server.rstrip('/')}/api/recipe/{recipe}/"
+  m = RECIPE_URL.match(recipe)
+  if m and not m.group('server').endswith('/api'):
+    return f"{m.group('server')}/api/recipe/{m.group('id')}/"
+  return recipe
+
+def cache_path(url: str, auth: str) -> pathlib.Path:
+  # per token too, another account sees other recipes under the same url.
+  key = hashlib.sha256(f"{auth}\n{url}".encode()).hexdigest()
+  return ARGS.cache_dir / 'tandoor' / f"{key}.json"
+
+def get(s, url: str, ttl: float):
+  path = cache_path(url, s.headers.get("Authorization", ""))
+  cached = None
+  if not ARGS.no_cache:
+    try:
+      cached = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+      # a truncated file is fetched again.
+      pass
+  if cached and time.time() - cached['fetched'] < ttl:
+    return cached['body']
+
+  headers = {"If-None-Match": cached['etag']} if cached and cached['etag'] else {}
+  res = s.get(url, headers=headers, timeout=TIMEOUT)
+  if res.status_code == 304:
+    body = cached['body']
+  else:
+    res.raise_for_status()
+    body = res.json()
+  if not ARGS.no_cache:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps({
+      'etag': res.headers.get('ETag') or (cached and cached['etag']),
+      'fetched': time.time(),
+      'body': body,
+    }))
+    tmp.replace(path)
+  return body
+
+def plan_recipes(s, server: str, plan: str, ttl: float):
+  # recipe ids of the meal plan entries from FROM[:TO], in plan order.
+  start, _, end = plan.partition(':')
+  url = f"{server.rstrip('/')}/api/meal-plan/?from_date={start}&to_date={end or start}"
+  ids = []
+  while url:
+    body = get(s, url, ttl)
+    # paginated on newer servers, a plain list on older ones.
+    entries = body['results'] if isinstance(body, dict) else body
+    url = body.get('next') if isinstance(body, dict) else None
+    for e in sorted(entries, key=lambda e: e.get('from_date') or ''):
+      if e.get('recipe') and e['recipe']['id'] not in ids:
+        ids.append(e['recipe']['id'])
+  return [str(i) for i in ids]
+
+def fetch_recipes(recipes, token, server: str = None, plan: str = None,
+                  jobs: int = 4, ttl: float = 3600):
+  # recipe ids or urls, then those on the meal plan, in that order.
+  from concurrent.futures import ThreadPoolExecutor
+  with session(token, jobs) as s:
+    if plan:
+      if not server:
+        raise Exception("--plan needs --server")
+      recipes = [*recipes, *plan_recipes(s, server, plan, ttl)]
+    urls = [recipe_url(r, server) for r in recipes]
+    with ThreadPoolExecutor(jobs) as ex:
+      return [rdata.to_rdict(r) for r in ex.map(lambda u: get(s, u, ttl), urls)]
+
+def fetch_recipe(url, token):
+  return fetch_recipes([url], token, jobs=1)[0]
@@ -0,0 +1,77 @@
+# plain text of any length wrapped to the paper a line at a time, so that only
+# a chunk of it is ever held in memory.
+
+# longest piece of a line read at once, longer lines are read in several.
+READ_CHUNK = 64 * 1024
+TAB_SIZE = 8
+
+
+def wrap_rows(text: str, width: int):
+  # (start, end) of the full rows of text, broken at spaces, words longer than
+  # width split, and where the rest starts.
+  rows = []
+  start = 0
+  n = len(text)
+  while n - start > width:
+    cut = text.rfind(" ", start + 1, start + width + 1)
+    end = cut
+    while end > start and text[end - 1] == " ":
+      end -= 1
+    if not text[start:start + width].strip(" "):
+      # indented further than the paper is wide.
+      pass
+    elif end <= start:
+      rows.append((start, start + width))
+      start += width
+    else:
+      rows.append((start, end))
+      start = cut + 1
+    while start < n and text[start] == " ":
+      start += 1
+  return rows, start
+
+def wrap_offsets(text: str, width: int, empty: bool = True):
+  # (start, end) of each line, and with empty one empty line for a text with
+  # nothing to print.
+  rows, start = wrap_rows(text, width)
+  n = len(text)
+  while n > start and text[n - 1] == " ":
+    n -= 1
+  if start < n or (empty and not rows):
+    rows.append((start, n))
+  return rows
+
+def wrap(f, width: int):
+  # lines of text from f, none longer than width.  Lines longer than
+  # READ_CHUNK arrive in pieces, the unfinished last line of a piece is carried
+  # over to the next.
+  rest = ""
+  # column of the line rest starts at, for the tab stops, and whether rows of
+  # it were printed already.
+  column = 0
+  wrapped = False
+  for piece in iter(lambda: f.readline(READ_CHUNK), ""):
+    pad = column % TAB_SIZE
+    text = (" " * pad + rest + piece).expandtabs(TAB_SIZE)[pad:]
+    if column and not rest:
+      # a line broken right at the end of the last piece, its spaces go.
+      stripped = text.lstrip(" ")
+      column += len(text) - len(stripped)
+      text = stripped
+    if text.endswith("\n"):
+      text = text[:-1]
+      for start, end in wrap_offsets(text, width, empty=not wrapped):
+        yield text[start:end]
+      rest = ""
+      column = 0
+      wrapped = False
+    else:
+      rows, start = wrap_rows(text, width)
+      for row_start, end in rows:
+        yield text[row_start:end]
+      rest = text[start:]
+      column += start
+      wrapped = wrapped or bool(rows)
+  if rest:
+    for start, end in wrap_offsets(rest, width, empty=not wrapped):
+      yield rest[start:end]
@@ -1,7 +1,76 @@
+import logging
+import re
+
+# ESC & y c1 c2 defines characters c1..c2, y bytes (8 dots each) per column.
+COLUMN_BYTES = 3
+FIRST_CODE = 0x20
+LAST_CODE = 0x7e
+
+# character cell per font where the profile doesn't know its paper width.
+FONT_COLUMNS = {'a': 12, 'b': 9}
+# the same cutoff as png-to-udc-ascii, darker pixels are dots.
+DARK = 30
+
+NOT_SPACE = re.compile(r"[^ ]")
+
+# (font, Udchars) too wide for the profile, warned about once.
+WARNED = set()
+
+
+def cell_width(profile, font: str) -> int:
+  # dots a character of font is wide, a guess from the paper width over the
+  # characters per line.  Profiles don't say how high glyphs are, every font
+  # is defined COLUMN_BYTES high.  Raises for fonts the profile doesn't have.
+  columns = profile.get_columns(font)
+  dots = profile.profile_data.get('media', {}).get('width', {}).get('pixels')
+  return dots // columns if isinstance(dots, int) else FONT_COLUMNS[font]
+
+def pack_pattern(width: int, rows: int, pattern: str, column_bytes: int = COLUMN_BYTES) -> bytes:
+  # rows of width characters, anything but a space is a dot, to column major
+  # glyph data: column_bytes per column, top dot the high bit of the first.
+  # A column at a time, as one binary number.
+  if width * rows != len(pattern):
+    raise ValueError(f"{len(pattern)} dots are not {width} x {rows}")
+  pad = column_bytes * 8 - rows
+  if pad < 0:
+    raise ValueError(f"{rows} rows, at most {column_bytes * 8}")
+  bits = NOT_SPACE.sub("1", pattern).replace(" ", "0")
+  return b"".join((int(bits[x::width], 2) << pad).to_bytes(column_bytes, 'big')
+                  for x in range(width)) if rows else bytes(width * column_bytes)
+
+def pack_image(img, column_bytes: int = COLUMN_BYTES) -> bytes:
+  # the same from an image, by Pillow: transposed the columns are rows, which
+  # mode 1 packs high bit first.
+  from PIL import Image
+  bits = column_bytes * 8
+  if img.height > bits:
+    raise ValueError(f"{img.height} dots high, at most {bits}")
+  dots = img.convert('L').point(lambda v: 255 if v <= DARK else 0, '1')
+  columns = Image.new('1', (bits, img.width), 0)
+  columns.paste(dots.transpose(Image.Transpose.TRANSPOSE), (0, 0))
+  return columns.tobytes()
+
+def define(first: int, glyphs, column_bytes: int = COLUMN_BYTES) -> bytes:
+  # one ESC & for codes first.., glyphs (pcols, bytes) in order.
+  return (b"\x1b&" + bytes([column_bytes, first, first + len(glyphs) - 1]) +
+          b"".join(bytes([pcols]) + data for pcols, data in glyphs))
+
+
 class Udchars:
   def __init__(self, placeholder: str, pcols: int, prows: int, pattern: str):
     self.placeholder = placeholder
-    self.chars = self.split_chars(len(placeholder), pcols, prows, pattern)
+    self.pcols = pcols
+    self.prows = prows
+    self.pattern = pattern
+    self.fonts = {}
+
+  @classmethod
+  def compiled(cls, placeholder: str, fonts: dict):
+    # glyphs made ahead of time by build-icons: font -> (pcols, glyph bytes of
+    # all characters one after another).
+    self = cls(placeholder, 0, 0, "")
+    self.fonts = fonts
+    return self
 
   def __len__(self):
     return len(self.placeholder)
@@ -9,77 +78,82 @@ class Udchars:
   def __str__(self):
     return self.placeholder
 
+  def packed(self, font: str):
+    # (pcols, bytes) drawn for font where there is such a version.  Patterns
+    # are only packed on first use, most scripts print a few icons.
+    if not self.fonts:
+      self.fonts[None] = (self.pcols, pack_pattern(len(self) * self.pcols, self.prows, self.pattern))
+    return self.fonts.get(font) or next(iter(self.fonts.values()))
+
+  def glyphs(self, font: str):
+    # (pcols, bytes) of each character.
+    pcols, data = self.packed(font)
+    size = pcols * COLUMN_BYTES
+    return [(pcols, data[i:i + size]) for i in range(0, len(data), size)]
+
+  def fits(self, profile, font: str) -> bool:
+    width = cell_width(profile, font)
+    pcols = self.packed(font)[0]
+    if pcols > width:
+      if (font, self) not in WARNED:
+        WARNED.add((font, self))
+        logging.warning("%r: characters %d dots wide, font %s probably takes %d, printing the placeholder",
+                        self.placeholder, pcols, font, width)
+      return False
+    return True
+
   def print_to_printer(self, printer, font: str, times: int = 1):
-    for char in self.chars:
-      char.print_char(printer=printer, font=font, times=times)
+    # glyphs already on the printer are reused, only new ones are defined,
+    # runs of consecutive codes by one command.
+    regs = registers(printer)
+    key = (font, self)
+    if key not in regs.fits:
+      regs.fits[key] = self.fits(printer.profile, font)
+    if not regs.fits[key]:
+      printer.text("".join(c * times for c in self.placeholder))
+      return
+    codes = []
+    new = []
+    for glyph in self.glyphs(font):
+      code, fresh = regs.allocate(font, glyph[1])
+      if fresh:
+        if not new or new[-1][0] + len(new[-1][1]) != code:
+          new.append((code, []))
+        new[-1][1].append(glyph)
+      codes.append(bytes([code]) * times)
+    for first, glyphs in new:
+      printer._raw(define(first, glyphs))
+    printer._raw(b"\x1b%\x01" + b"".join(codes) + b"\x1b%\x00")
 
-  @staticmethod
-  def split_chars(char_count: int, pcols: int, prows: int, pattern: str):
-    if char_count * pcols * prows != len(pattern):
-      raise ValueError()
 
-    row_length = len(pattern) / prows
-    if not row_length.is_integer():
-      raise ValueError(f"not int: {row_length}")
+class Registers:
+  # which user defined character code holds which glyph on the printer, so
+  # each glyph is only sent once per job.
 
-    row_length = int(row_length)
-    pattern_rows = [pattern[i:i + row_length] for i in range(0, len(pattern), row_length)]
+  def __init__(self):
+    self.codes = {}
+    self.next = FIRST_CODE
+    # (font, Udchars) -> whether it fits the profile's cells.
+    self.fits = {}
 
-    ret = []
-    for i in range(0, char_count):
-      x = i * pcols
-      char_ptn = ''.join([p[x:x + pcols] for p in pattern_rows])
-      ret.append(Udchar(pcols, prows, char_ptn))
-    return ret
+  def allocate(self, font: str, char_bytes: bytes):
+    key = (font, char_bytes)
+    if key in self.codes:
+      return self.codes[key], False
+    if self.next > LAST_CODE:
+      # out of codes, start overwriting from the beginning.
+      self.codes = {}
+      self.next = FIRST_CODE
+    code = self.next
+    self.next += 1
+    self.codes[key] = code
+    return code, True
 
+  def clear(self):
+    self.codes = {}
+    self.next = FIRST_CODE
 
-class Udchar:
-  def __init__(self, pcols: int, prows: int, pattern: str):
-    self.pcols = pcols
-    self.prows = prows
-    self.char_bytes = self.mk_char(pcols, prows, pattern)
-
-  def print_char(self, printer, font: str, times: int = 1):
-    sub  = bytes(font, "ascii")
-
-    self.prt(printer, [0x1b, b"&", 3, sub, sub])
-    self.prt(printer, [self.pcols])
-    self.prt(printer, self.char_bytes)
-    self.prt(printer, [0x1b, b"%", 1])
-    for x in range(0, times):
-      self.prt(printer, sub)
-    self.prt(printer, [0x1b, b"%", 0])
-
-  @staticmethod
-  def prt(printer, data: [bytes | list[int]]):
-    output = []
-    for b in data:
-      if isinstance(b, int):
-        output.append(bytes([b]))
-      elif isinstance(b, bytes):
-        output.append(b)
-      else:
-        raise ValueException()
-    printer._raw(b"".join(output))
-
-  @staticmethod
-  def mk_char(pcols: int, prows: int, pattern: str) -> bytes:
-    if pcols * prows != len(pattern):
-      raise ValueError()
-
-    s = [pattern[i:i + pcols] for i in range(0, len(pattern), pcols)]
-    if len(s) != prows:
-      raise ValueError(f"wrong number of rows: {len(s)}")
-
-    output = b""
-    for col in range(0, pcols):
-      for row in range(0, 3):
-        byte = ""
-        for bit in range(0, 8):
-          y = row * 8 + bit
-          if y >= prows:
-            byte += "0"
-          else:
-            byte += "0" if s[y][col] == " " else "1"
-        output += bytes([int(byte, 2)])
-    return output
+def registers(printer) -> Registers:
+  if not hasattr(printer, 'udchar_registers'):
+    printer.udchar_registers = Registers()
+  return printer.udchar_registers